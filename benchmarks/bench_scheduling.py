@@ -0,0 +1,58 @@
+"""
+Simulate the total wall time of a run with the directory walk order and with the largest-first order.
+
+Usage:
+    python -m benchmarks.bench_scheduling [path/to/repo] [--workers 4]
+
+Without a path, a synthetic repository with many small files and a few huge ones at the end of the walk is used.
+The cost of a request is modelled as a fixed latency plus a time proportional to the file size.
+"""
+import argparse
+import random
+
+from src.scheduler import build_file_manifest, order_by_cost, simulate_makespan
+
+# Seconds per request, independent of the file size
+REQUEST_LATENCY = 1.5
+# Seconds per byte of source sent in the prompt
+SECONDS_PER_BYTE = 0.0002
+
+
+def request_cost(size: int) -> float:
+    return REQUEST_LATENCY + size * SECONDS_PER_BYTE
+
+
+def synthetic_manifest(seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    manifest = [{"path": f"src/module_{i}.py", "size": rng.randint(200, 6_000)} for i in range(200)]
+    manifest += [{"path": f"vendor/generated_{i}.py", "size": rng.randint(100_000, 400_000)} for i in range(6)]
+    return manifest
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Job ordering benchmark")
+    parser.add_argument("repo", nargs="?", default=None, help="A directory to take the file sizes from")
+    parser.add_argument("--workers", type=int, default=4, help="The number of concurrent analysis requests")
+    parser.add_argument("--ignore_file", default=None, help="The path to the ignore file")
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    manifest = build_file_manifest(args.repo, args.ignore_file) if args.repo else synthetic_manifest()
+    if not manifest:
+        print("No files to analyze.")
+        return
+
+    walk_order = simulate_makespan([request_cost(entry["size"]) for entry in manifest], args.workers)
+    largest_first = simulate_makespan([request_cost(entry["size"]) for entry in order_by_cost(manifest)], args.workers)
+    lower_bound = max(sum(request_cost(entry["size"]) for entry in manifest) / args.workers,
+                      max((request_cost(entry["size"]) for entry in manifest), default=0))
+
+    print(f"Files: {len(manifest)}, workers: {args.workers}")
+    print(f"Walk order:    {walk_order:10.1f}s")
+    print(f"Largest first: {largest_first:10.1f}s ({100 * (largest_first - walk_order) / walk_order:+.1f}%)")
+    print(f"Lower bound:   {lower_bound:10.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,20 +4,47 @@ import argparse
 import pathlib
 
 from progress.bar import ChargingBar
-from .scan_repo import scan_repo, scan_git_repo
+from .scan_repo import scan_repo, scan_git_repo, scan_archive, DEFAULT_WORKERS
+from .sources import is_archive, is_bare_repo
+from .batch import scan_repos, read_repos_file, get_repo_name
 from .generate_wiki import generate_wiki
+from .wiki_bundle import write_bundle, export_bundle
 from .utils import delete_dir, count_processable_files, is_github_url
 
 
 load_dotenv()
 
 
+def save_wiki(context: dict, output_path: str, bundle_path: str | None = None, repo_name: str | None = None,
+              content_hashes: dict | None = None) -> None:
+    """
+    Save the Wiki pages as markdown files, or in a single bundle file if a bundle path is given.
+    :param context: List of files and directories and their contents in the repository.
+    :param output_path: The path to the output directory where the wiki pages will be saved (in .md format).
+    :param bundle_path: The path to the bundle file.
+    :param repo_name: The repository name. Pages are saved under it in the bundle, like in batch mode.
+    :param content_hashes: The hash of the contents of each documented file, saved in the bundle.
+    :return: None
+    """
+    if bundle_path:
+        print(f"\nSaving Wiki pages in: {bundle_path}")
+        write_bundle(context, bundle_path, prefix=f"{repo_name}/" if repo_name else "", content_hashes=content_hashes)
+        return
+
+    print(f"\nGenerating Wiki pages in: {output_path}")
+    generate_wiki(context, output_path)
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="A Github Wiki Generator")
-    parser.add_argument(
+    repo_group = parser.add_mutually_exclusive_group()
+    repo_group.add_argument(
         "--repo",
-        required=True,
-        help="The path to the Git repository for which the wiki will be generated",
+        help="The path to the Git repository (a directory, GitHub URL, .tar.gz/.zip archive or bare repository) for which the wiki will be generated",
+    )
+    repo_group.add_argument(
+        "--repos-file",
+        help="The path to a file listing the paths or URLs of several repositories (one per line) to generate the wiki for",
     )
     parser.add_argument(
         "--output",
@@ -31,14 +58,81 @@ def main() -> None:
         default=None,
         help="The path to the output directory where the wiki pages will be saved (in .md format)",
     )
+    parser.add_argument(
+        "--workers",
+        required=False,
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="The number of files analyzed concurrently",
+    )
+    parser.add_argument(
+        "--ref",
+        required=False,
+        default="HEAD",
+        help="The branch, tag or commit to document when --repo is a bare Git repository",
+    )
+    parser.add_argument(
+        "--bundle",
+        required=False,
+        default=None,
+        help="The path to a single SQLite file where the wiki pages will be saved instead of the markdown files",
+    )
+    parser.add_argument(
+        "--export",
+        action="store_true",
+        help="Render the markdown wiki pages stored in --bundle into --output, instead of scanning a repository",
+    )
+    parser.add_argument(
+        "--similarity-threshold",
+        required=False,
+        type=float,
+        default=None,
+        help="Reuse the summary of an already analyzed file for files at least this similar to it (between 0 and 1, e.g. 0.9)",
+    )
+    parser.add_argument(
+        "--delta-prompts",
+        action="store_true",
+        help="Update the reused summary of near-duplicate files with a short prompt describing only their differences",
+    )
     args = parser.parse_args()
 
+    if args.similarity_threshold is not None and not 0 < args.similarity_threshold <= 1:
+        parser.error("--similarity-threshold must be between 0 and 1")
+
+    if args.export:
+        if not args.bundle:
+            parser.error("--export requires --bundle")
+        written, removed = export_bundle(args.bundle, args.output)
+        print(f"Exported {written} page{"s" if written != 1 else ""} from {args.bundle} to {args.output}, "
+              f"removed {removed} stale page{"s" if removed != 1 else ""}")
+        return
+
+    if not args.repo and not args.repos_file:
+        parser.error("one of the arguments --repo --repos-file is required")
+
+    content_hashes = {}
+
+    if args.repos_file:
+        scan_repos(read_repos_file(args.repos_file), args.output, args.ignore_file, args.workers, args.bundle,
+                   args.similarity_threshold, args.delta_prompts)
+        return
+
     if is_github_url(args.repo):
-        delete_dir(args.output)
-        context = scan_git_repo(args.repo, args.ignore_file)
+        if not args.bundle:
+            delete_dir(args.output)
+        context = scan_git_repo(args.repo, args.ignore_file, args.workers, args.similarity_threshold,
+                                args.delta_prompts, content_hashes)
 
-        print(f"\nGenerating Wiki pages in: {args.output}")
-        generate_wiki(context, args.output)
+        save_wiki(context, args.output, args.bundle, get_repo_name(args.repo), content_hashes)
+        return
+
+    if is_archive(args.repo) or is_bare_repo(args.repo):
+        if not args.bundle:
+            delete_dir(args.output)
+        context = scan_archive(args.repo, args.ignore_file, args.workers, args.ref, args.similarity_threshold,
+                               args.delta_prompts, content_hashes)
+
+        save_wiki(context, args.output, args.bundle, get_repo_name(args.repo), content_hashes)
         return
 
     output_path = str(os.path.join(args.repo, args.output))
@@ -46,17 +140,18 @@ def main() -> None:
     if os.path.isfile(args.repo):
         output_path = args.output
 
-    delete_dir(output_path)
+    if not args.bundle:
+        delete_dir(output_path)
 
     total_files, total_folders = count_processable_files(args.repo, args.ignore_file)
     print(f"Found {total_files} file{"s" if total_files > 1 else ""} in {total_folders} folder{"s" if total_folders > 1 else ""} to analyze.")
 
     # Create progress bar
     progress_bar = ChargingBar(f"Scanning repository: {pathlib.Path(args.repo).name or args.repo}", max=total_files, suffix='%(index)d/%(max)d files (%(percent).1f%%)')
-    context = scan_repo(args.repo, progress_bar, args.ignore_file)
+    context = scan_repo(args.repo, progress_bar, args.ignore_file, args.workers, args.similarity_threshold,
+                        args.delta_prompts, content_hashes)
 
-    print(f"\nGenerating Wiki pages in: {output_path}")
-    generate_wiki(context, output_path)
+    save_wiki(context, output_path, args.bundle, get_repo_name(args.repo), content_hashes)
 
 
 if __name__ == "__main__":
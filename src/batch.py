@@ -0,0 +1,245 @@
+import os
+import pathlib
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+from progress.bar import ChargingBar
+from requests.adapters import HTTPAdapter
+from .generate_wiki import generate_wiki
+from .get_code_summary import CodeAnalyzer
+from .scan_repo import clone_github_repo, get_clone_root, analyze_manifest, analyze_source, GITHUB_AUTH_TOKEN, DEFAULT_WORKERS
+from .scheduler import build_file_manifest
+from .sources import ARCHIVE_EXTENSIONS, is_archive, is_bare_repo, open_source
+from .utils import delete_dir, is_github_url
+from .wiki_bundle import write_bundle
+
+
+def read_repos_file(repos_file_path: str) -> list[str]:
+    """
+    Read the list of repositories to document.
+    :param repos_file_path: Path to a file with one local path, GitHub URL, archive or bare Git repository per line. Empty lines and lines starting with # are skipped.
+    :return: The list of repository paths and URLs.
+    """
+    with open(repos_file_path, "r") as file:
+        lines = file.readlines()
+
+    repos = []
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            repos.append(line)
+
+    return repos
+
+
+def get_repo_name(repo: str) -> str:
+    """
+    Get the name of the output folder of a repository.
+    :param repo: The local path or GitHub URL of the repository.
+    :return: The repository name.
+    """
+    if is_github_url(repo):
+        path_parts = urlparse(repo).path.strip("/").split("/")
+        name = path_parts[1] if len(path_parts) >= 2 else path_parts[0]
+        return name.removesuffix(".git")
+
+    name = pathlib.Path(repo).resolve().name
+    for extension in ARCHIVE_EXTENSIONS + (".git",):
+        if name.lower().endswith(extension):
+            return name[:-len(extension)]
+
+    return name
+
+
+def prepare_repo(repo: str) -> tuple[str, str | None]:
+    """
+    Get a local directory for the repository, cloning it first if it's a GitHub URL.
+    Archives and bare Git repositories are returned as is, they are read without being extracted.
+    :param repo: The local path or GitHub URL of the repository.
+    :return: The path to the local directory, and the temporary directory to delete once done (None if not cloned).
+    """
+    if is_archive(repo) or is_bare_repo(repo):
+        return repo, None
+
+    if not is_github_url(repo):
+        if not pathlib.Path(repo).is_dir():
+            raise ValueError(f"The provided path is not a valid directory: {repo}")
+        return repo, None
+
+    local_path = clone_github_repo(repo, GITHUB_AUTH_TOKEN)
+    return local_path, get_clone_root(repo, local_path)
+
+
+def cleanup_prepared_repo(prepared: Future) -> None:
+    """
+    Delete the temporary clone of a repository that was prepared but not scanned.
+    :param prepared: The future of the prepare_repo call.
+    :return: None
+    """
+    try:
+        _, temp_root = prepared.result()
+    except Exception:
+        return
+
+    if temp_root:
+        delete_dir(temp_root)
+
+
+def format_stats(name: str, stats: dict) -> str:
+    """
+    Format the throughput stats of a run.
+    :param name: The name to show in front of the stats.
+    :param stats: A dictionary with the files, bytes and seconds of the run, and optionally the near-duplicate stats.
+    :return: A single line summary of the stats.
+    """
+    seconds = stats["seconds"] or 1e-9
+    line = (f"{name}: {stats['files']} files, {stats['bytes'] / 1024:.1f} KiB in {stats['seconds']:.1f}s "
+            f"({stats['files'] / seconds:.2f} files/s, {stats['bytes'] / 1024 / seconds:.1f} KiB/s)")
+    if "near_duplicates" in stats:
+        line += (f", {stats['near_duplicates']} near-duplicates ({100 * stats['hit_rate']:.1f}% "
+                 f"at similarity >= {stats['threshold']:.2f})")
+
+    return line
+
+
+def scan_repos(repos: list[str], output_path: str, ignore_file_path: str | None = None,
+               workers: int = DEFAULT_WORKERS, bundle_path: str | None = None,
+               similarity_threshold: float | None = None, delta_prompts: bool = False) -> dict:
+    """
+    Generate the Wiki pages of several repositories in one process.
+    All repositories share the analysis worker pool and the HTTP session. The next repository is cloned while the
+    current one is being analyzed, and its files are queued as soon as all the files of the current one are, so the
+    pool doesn't idle on the last, long requests of each repository.
+    :param repos: The local paths, GitHub URLs, archives and bare Git repositories (scanned at HEAD).
+    :param output_path: The output directory. The pages of each repository are saved in a folder named after it.
+    :param ignore_file_path: Path to the ignore file.
+    :param workers: The number of files analyzed concurrently.
+    :param bundle_path: The path to a bundle file to save the pages of all repositories in, prefixed by the repository name.
+    :param similarity_threshold: The minimum similarity (0 to 1) for a file to reuse the summary of a near-duplicate.
+    :param delta_prompts: Update the reused summary with a prompt describing only the differences between the files.
+    :return: The throughput stats of each repository ("repos", keyed by output folder name) and of the whole run ("total").
+        The runs of consecutive repositories overlap, so the seconds of the repositories add up to more than the total.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, workers))
+    session.mount("https://", adapter)
+    analyzer = CodeAnalyzer(session=session)
+    # Repositories finishing at the same time don't write their pages concurrently
+    output_lock = threading.Lock()
+
+    def document_repo(repo: str, name: str, local_path: str, temp_root: str | None, queued: threading.Event) -> dict | None:
+        repo_started = time.perf_counter()
+        source = None
+        try:
+            if is_archive(local_path) or is_bare_repo(local_path):
+                source = open_source(local_path, ignore_file_path=ignore_file_path)
+                manifest = source.manifest()
+            else:
+                manifest = build_file_manifest(local_path, ignore_file_path)
+
+            progress_bar = ChargingBar(f"Scanning repository: {name}", max=len(manifest),
+                                       suffix='%(index)d/%(max)d files (%(percent).1f%%)')
+            duplicate_stats = {}
+            content_hashes = {}
+            if source:
+                contents = analyze_source(source, manifest, progress_bar, executor=executor, analyzer=analyzer,
+                                          similarity_threshold=similarity_threshold, delta_prompts=delta_prompts,
+                                          stats=duplicate_stats, content_hashes=content_hashes, on_queued=queued.set)
+            else:
+                contents = analyze_manifest(local_path, manifest, progress_bar, executor=executor, analyzer=analyzer,
+                                            similarity_threshold=similarity_threshold, delta_prompts=delta_prompts,
+                                            stats=duplicate_stats, content_hashes=content_hashes,
+                                            on_queued=queued.set)
+            progress_bar.finish()
+
+            with output_lock:
+                if bundle_path:
+                    write_bundle(contents, bundle_path, prefix=f"{name}/", content_hashes=content_hashes)
+                else:
+                    repo_output_path = os.path.join(output_path, name)
+                    delete_dir(repo_output_path)
+                    generate_wiki(contents, repo_output_path)
+        except Exception as e:
+            print(f"\nFailed to generate the Wiki pages of {repo}: {str(e)}")
+            return None
+        finally:
+            # Let the next repository start even if this one failed before queuing its files
+            queued.set()
+            if source:
+                source.close()
+            # Clean up temporary directory
+            if temp_root:
+                delete_dir(temp_root)
+
+        stats = {
+            "files": len(manifest),
+            "bytes": sum(entry["size"] for entry in manifest),
+            "seconds": time.perf_counter() - repo_started,
+            **duplicate_stats,
+        }
+        print(format_stats(name, stats))
+        return stats
+
+    repo_stats = {}
+    total = {"files": 0, "bytes": 0, "seconds": 0.0}
+    if similarity_threshold:
+        total.update({"threshold": similarity_threshold, "near_duplicates": 0})
+    started = time.perf_counter()
+    names = set()
+    documented = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor, ThreadPoolExecutor(max_workers=1) as cloner, \
+            ThreadPoolExecutor(max_workers=2) as documenter:
+        next_clone: Future | None = cloner.submit(prepare_repo, repos[0]) if repos else None
+
+        try:
+            for index, repo in enumerate(repos):
+                try:
+                    local_path, temp_root = next_clone.result()
+                except Exception as e:
+                    print(f"\nSkipping {repo}: {str(e)}")
+                    local_path, temp_root = None, None
+
+                # Start cloning the next repository while this one is being analyzed
+                next_clone = cloner.submit(prepare_repo, repos[index + 1]) if index + 1 < len(repos) else None
+                if local_path is None:
+                    continue
+
+                name = get_repo_name(repo)
+                suffix = 2
+                while name in names:
+                    name = f"{get_repo_name(repo)}-{suffix}"
+                    suffix += 1
+                names.add(name)
+
+                queued = threading.Event()
+                documented[name] = documenter.submit(document_repo, repo, name, local_path, temp_root, queued)
+                # Move on to the next repository once all the files of this one are queued
+                queued.wait()
+        finally:
+            # Don't leave the clone of the next repository behind if the batch is interrupted
+            if next_clone is not None:
+                cleanup_prepared_repo(next_clone)
+
+    session.close()
+
+    for name, future in documented.items():
+        stats = future.result()
+        if stats is None:
+            continue
+
+        repo_stats[name] = stats
+        total["files"] += stats["files"]
+        total["bytes"] += stats["bytes"]
+        if similarity_threshold:
+            total["near_duplicates"] += stats["near_duplicates"]
+
+    total["seconds"] = time.perf_counter() - started
+    if similarity_threshold:
+        total["hit_rate"] = total["near_duplicates"] / total["files"] if total["files"] else 0.0
+    print(format_stats("Total", total))
+
+    return {"repos": repo_stats, "total": total}
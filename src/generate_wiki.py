@@ -3,6 +3,15 @@ import os
 from src.utils import delete_dir
 
 
+def wiki_page_name(file_name: str) -> str:
+    """
+    Get the name of the Wiki page of a file.
+    :param file_name: The name of the file.
+    :return: The file name with its extension replaced by .md.
+    """
+    return ".".join(file_name.split(".")[:-1]) + ".md"
+
+
 def generate_wiki(context: dict, output_path: str) -> None:
     """
     Generate Wiki pages for the repository.
@@ -20,7 +29,7 @@ def generate_wiki(context: dict, output_path: str) -> None:
                 delete_dir(folder_path)
         elif isinstance(context[item], str):
             # This is a file
-            file_name = ".".join(item.split(".")[:-1]) + ".md"
+            file_name = wiki_page_name(item)
             file_path = os.path.join(output_path, file_name)
             if context[item]:
                 with open(file_path, "w", encoding="utf-8") as wiki_file:
@@ -1,4 +1,5 @@
 from dotenv import load_dotenv
+import difflib
 import json
 import os
 import subprocess
@@ -8,6 +9,21 @@ import requests
 
 load_dotenv()
 
+MODEL_NAME = "gemini-2.0-flash"
+
+# Descriptions returned when a file couldn't be analyzed
+FAILED_DESCRIPTIONS = ("Analysis timed out", "Analysis failed after multiple attempts", "Empty file or unreadable content")
+ERROR_PREFIX = "Error during analysis"
+
+
+def is_failed_description(description: str) -> bool:
+    """
+    Check if a file description is an analysis error rather than a summary.
+    :param description: The file description.
+    :return: True if the analysis failed, False otherwise.
+    """
+    return not description or description in FAILED_DESCRIPTIONS or description.startswith(ERROR_PREFIX)
+
 
 def _sanitize_code(code: str) -> str:
     # Remove any null bytes and normalize line endings
@@ -15,9 +31,35 @@ def _sanitize_code(code: str) -> str:
 
 
 class CodeAnalyzer:
-    def __init__(self, timeout: int = 45, max_retries: int = 3) -> None:
+    def __init__(self, timeout: int = 45, max_retries: int = 3, session: requests.Session | None = None) -> None:
         self.timeout = timeout
         self.max_retries = max_retries
+        # A shared session keeps the connections to the API open between files (and between repositories)
+        self.session = session or requests
+
+    def _generate(self, prompt: str) -> str:
+        # Call Gemini API to get file summary
+        payload = {
+            "contents": [{
+                "parts": [{
+                    "text": prompt
+                }]
+            }]
+        }
+        response = self.session.post(
+            f"https://generativelanguage.googleapis.com/v1beta/models/{MODEL_NAME}:generateContent?key={os.environ['GEMINI_API_KEY']}",
+            data=json.dumps(payload),
+            headers={
+                "Content-Type": "application/json",
+            }
+        )
+
+        explanation = response.json()
+        meaningful_content = explanation["candidates"][0]["content"]["parts"][0]["text"]
+        if meaningful_content.startswith("```") and meaningful_content.endswith("```"):
+            meaningful_content = "\n".join(meaningful_content.split("\n")[1:-1])
+
+        return meaningful_content if meaningful_content else ""
 
     def analyze_code_block(self, code: str, filename: str, retry_count: int = 0) -> str:
         code = _sanitize_code(code)
@@ -53,28 +95,7 @@ class CodeAnalyzer:
             - DO NOT generate any section other than the ones mentioned here
         """
         try:
-            # Call Gemini API to get file summary
-            payload = {
-                "contents": [{
-                    "parts": [{
-                        "text": prompt
-                    }]
-                }]
-            }
-            response = requests.post(
-                f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={os.environ['GEMINI_API_KEY']}",
-                data=json.dumps(payload),
-                headers={
-                    "Content-Type": "application/json",
-                }
-            )
-
-            explanation = response.json()
-            meaningful_content = explanation["candidates"][0]["content"]["parts"][0]["text"]
-            if meaningful_content.startswith("```") and meaningful_content.endswith("```"):
-                meaningful_content = "\n".join(meaningful_content.split("\n")[1:-1])
-
-            return meaningful_content if meaningful_content else ""
+            return self._generate(prompt)
 
         except subprocess.TimeoutExpired:
             return "Analysis timed out"
@@ -84,6 +105,44 @@ class CodeAnalyzer:
                 return self.analyze_code_block(code, filename, retry_count + 1)
             return "Analysis failed after multiple attempts"
 
+    def analyze_delta(self, code: str, filename: str, original_code: str, original_filename: str,
+                      original_summary: str) -> str:
+        code = _sanitize_code(code)
+        original_code = _sanitize_code(original_code)
+        if not code:
+            return "Empty file or unreadable content"
+
+        diff = "\n".join(difflib.unified_diff(original_code.split("\n"), code.split("\n"),
+                                              original_filename, filename, lineterm=""))
+        if not diff or not original_summary:
+            return original_summary
+
+        prompt = f"""
+            You are a world class expert at code documentation. I am trying to generate documentation for the code I wrote.
+
+            The file {filename} is an almost identical copy of the file {original_filename}, which is already documented.
+
+            Below is the documentation of {original_filename}:
+            {original_summary}
+
+            Below are the differences between {original_filename} and {filename}:
+            {diff}
+
+            Update the documentation so it describes {filename}. Keep the same sections and wording, and only change
+            what the differences require.
+
+            IMPORTANT: 
+            - DO NOT include the actual code anywhere
+            - DO NOT mention that the file is a copy of another file
+            - DO NOT generate any section other than the ones in the original documentation
+        """
+        try:
+            return self._generate(prompt) or original_summary
+
+        except Exception:
+            # The original summary is still a close description of the file
+            return original_summary
+
     def analyze_file(self, file_path: str) -> dict:
         path = pathlib.Path(file_path)
         name = path.name
@@ -106,4 +165,21 @@ class CodeAnalyzer:
             }
 
         except Exception as e:
-            return {"name": name, "description": f"Error during analysis: {str(e)}"}
+            return {"name": name, "description": f"{ERROR_PREFIX}: {str(e)}"}
+
+    def analyze_content(self, content: bytes, filename: str) -> dict:
+        name = pathlib.PurePosixPath(filename).name
+
+        try:
+            if len(content) == 0:
+                return {"name": name, "description": "Empty file"}
+
+            description = self.analyze_code_block(content.decode("utf-8", errors="ignore"), name)
+
+            return {
+                "name": name,
+                "description": description or "",
+            }
+
+        except Exception as e:
+            return {"name": name, "description": f"{ERROR_PREFIX}: {str(e)}"}
@@ -1,23 +1,30 @@
 import os
 import pathlib
 import tempfile
+from concurrent.futures import Executor
+from typing import Callable
 from urllib.parse import urlparse
 from git import Repo
 from progress.bar import ChargingBar
 from .get_code_summary import CodeAnalyzer
-from .utils import is_allowed_file, is_allowed_folder, delete_dir, is_github_url, count_processable_files
+from .scheduler import build_file_manifest, run_jobs
+from .similarity import NearDuplicateFinder, summarize_duplicates, format_duplicate_stats
+from .sources import open_source
+from .utils import is_allowed_file, is_allowed_folder, delete_dir, is_github_url, count_processable_files, hash_content
 
 GITHUB_AUTH_TOKEN = os.environ["GITHUB_AUTH_TOKEN"]
+DEFAULT_WORKERS = 4
 
 
-def read_file(file_path: str) -> dict:
+def read_file(file_path: str, analyzer: CodeAnalyzer | None = None) -> dict:
     """
     Read file contents and return a metadata object with the file data.
     :param file_path: The path to the file.
+    :param analyzer: The analyzer to use. A new one is created if not provided.
     :return: A metadata object with the file data.
     """
 
-    analyzer = CodeAnalyzer()
+    analyzer = analyzer or CodeAnalyzer()
 
     # Check if the provided path is a valid file
     if not pathlib.Path(file_path).is_file():
@@ -62,43 +69,180 @@ def clone_github_repo(github_url: str, auth_token: str = None) -> str:
     return clone_dir
 
 
-def list_directory_contents(path=".", progress_bar: ChargingBar = None, ignore_file_path: str | None = None) -> dict:
+def get_clone_root(github_url: str, clone_dir: str) -> str:
+    """
+    Get the temporary directory created by clone_github_repo, to delete it once the repository is scanned.
+    :param github_url: The GitHub repository URL
+    :param clone_dir: The path returned by clone_github_repo
+    :return: The path to the temporary directory
+    """
+    path_parts = urlparse(github_url).path.strip('/').split('/')
+    return os.path.dirname(clone_dir) if len(path_parts) >= 2 else clone_dir
+
+
+def run_analysis(manifest: list[dict], read: Callable[[dict], bytes], progress_bar: ChargingBar = None,
+                 workers: int = DEFAULT_WORKERS, executor: Executor | None = None, analyzer: CodeAnalyzer | None = None,
+                 similarity_threshold: float | None = None, delta_prompts: bool = False, stats: dict | None = None,
+                 content_hashes: dict | None = None, on_queued: Callable[[], None] | None = None) -> dict:
+    """
+    Analyze the files of a manifest, reusing the summaries of near-duplicate files if a similarity threshold is given.
+    :param manifest: The file manifest, as returned by build_file_manifest.
+    :param read: A function taking a manifest entry and returning the file contents.
+    :param progress_bar: A progress bar to show the scanning progress.
+    :param workers: The number of files analyzed concurrently (ignored when an executor is given).
+    :param executor: A shared executor to run the analysis on.
+    :param analyzer: A shared analyzer to use for every file.
+    :param similarity_threshold: The minimum similarity (0 to 1) for a file to reuse the summary of a near-duplicate.
+    :param delta_prompts: Update the reused summary with a prompt describing only the differences between the files.
+    :param stats: A dictionary updated with the near-duplicate stats of the run.
+    :param content_hashes: A dictionary updated with the hash of the contents of each file, keyed by file path.
+    :param on_queued: A function called once every file is queued, before the last files are analyzed.
+    :return: A dictionary with the file names as keys and their descriptions as values.
+    """
+    analyzer = analyzer or CodeAnalyzer()
+    # Contents read while looking for near-duplicates, kept until the analysis needs them so each file is read once.
+    # With delta prompts, the contents of the original files are kept until the end of the run for the diffs.
+    cache = {}
+
+    def read_and_hash(entry: dict) -> bytes:
+        data = read(entry)
+        if content_hashes is not None:
+            content_hashes[entry["path"]] = hash_content(data)
+        return data
+
+    def read_and_cache(entry: dict) -> bytes:
+        cache[entry["path"]] = read_and_hash(entry)
+        return cache[entry["path"]]
+
+    def read_once(entry: dict, keep: bool = False) -> bytes:
+        data = cache.get(entry["path"]) if keep else cache.pop(entry["path"], None)
+        return read_and_hash(entry) if data is None else data
+
+    def analyze(entry: dict) -> str:
+        return analyzer.analyze_content(read_once(entry, keep=delta_prompts), entry["path"])["description"]
+
+    finder = NearDuplicateFinder(read_and_cache, similarity_threshold) if similarity_threshold else None
+
+    analyze_delta = None
+    if finder and delta_prompts:
+        def analyze_delta(entry: dict, original: dict, original_summary: str) -> str:
+            return analyzer.analyze_delta(read_once(entry).decode("utf-8", errors="ignore"), entry["path"],
+                                          read_once(original, keep=True).decode("utf-8", errors="ignore"),
+                                          original["path"], original_summary)
+
+    contents = run_jobs(manifest, analyze, workers, progress_bar, executor, finder.match if finder else None,
+                        analyze_delta, on_queued)
+
+    cache.clear()
+
+    if finder and stats is not None:
+        stats.update(summarize_duplicates(manifest, finder.duplicates, similarity_threshold))
+
+    return contents
+
+
+def analyze_manifest(path: str, manifest: list[dict], progress_bar: ChargingBar = None, workers: int = DEFAULT_WORKERS,
+                     executor: Executor | None = None, analyzer: CodeAnalyzer | None = None,
+                     similarity_threshold: float | None = None, delta_prompts: bool = False,
+                     stats: dict | None = None, content_hashes: dict | None = None,
+                     on_queued: Callable[[], None] | None = None) -> dict:
+    """
+    Analyze the files of a manifest built for the given directory.
+    :param path: The path to the directory the manifest was built from.
+    :param manifest: The file manifest, as returned by build_file_manifest.
+    :param progress_bar: A progress bar to show the scanning progress.
+    :param workers: The number of files analyzed concurrently (ignored when an executor is given).
+    :param executor: A shared executor to run the analysis on.
+    :param analyzer: A shared analyzer to use for every file.
+    :param similarity_threshold: The minimum similarity (0 to 1) for a file to reuse the summary of a near-duplicate.
+    :param delta_prompts: Update the reused summary with a prompt describing only the differences between the files.
+    :param stats: A dictionary updated with the near-duplicate stats of the run.
+    :param content_hashes: A dictionary updated with the hash of the contents of each file, keyed by file path.
+    :param on_queued: A function called once every file is queued, before the last files are analyzed.
+    :return: A dictionary with the file names as keys and their descriptions as values.
+    """
+    def read(entry: dict) -> bytes:
+        with open(f"{path}/{entry['path']}", "rb") as f:
+            return f.read()
+
+    return run_analysis(manifest, read, progress_bar, workers, executor, analyzer, similarity_threshold,
+                        delta_prompts, stats, content_hashes, on_queued)
+
+
+def analyze_source(source, manifest: list[dict], progress_bar: ChargingBar = None, workers: int = DEFAULT_WORKERS,
+                   executor: Executor | None = None, analyzer: CodeAnalyzer | None = None,
+                   similarity_threshold: float | None = None, delta_prompts: bool = False,
+                   stats: dict | None = None, content_hashes: dict | None = None,
+                   on_queued: Callable[[], None] | None = None) -> dict:
+    """
+    Analyze the files of an archive or bare Git repository.
+    :param source: The source opened with open_source.
+    :param manifest: The file manifest of the source.
+    :param progress_bar: A progress bar to show the scanning progress.
+    :param workers: The number of files analyzed concurrently (ignored when an executor is given).
+    :param executor: A shared executor to run the analysis on.
+    :param analyzer: A shared analyzer to use for every file.
+    :param similarity_threshold: The minimum similarity (0 to 1) for a file to reuse the summary of a near-duplicate.
+    :param delta_prompts: Update the reused summary with a prompt describing only the differences between the files.
+    :param stats: A dictionary updated with the near-duplicate stats of the run.
+    :param content_hashes: A dictionary updated with the hash of the contents of each file, keyed by file path.
+    :param on_queued: A function called once every file is queued, before the last files are analyzed.
+    :return: A dictionary with the file names as keys and their descriptions as values.
+    """
+    def read(entry: dict) -> bytes:
+        return source.read(entry["path"])
+
+    return run_analysis(manifest, read, progress_bar, workers, executor, analyzer, similarity_threshold,
+                        delta_prompts, stats, content_hashes, on_queued)
+
+
+def list_directory_contents(path=".", progress_bar: ChargingBar = None, ignore_file_path: str | None = None,
+                            workers: int = DEFAULT_WORKERS, similarity_threshold: float | None = None,
+                            delta_prompts: bool = False, content_hashes: dict | None = None) -> dict:
     """
     Get the contents of a directory and its subdirectories.
+    Files are analyzed concurrently, the biggest ones first, so that no long request is left running alone at the end.
     :param ignore_file_path: Path to the ignore file.
     :param path: The path to the directory to scan.
     :param progress_bar: A progress bar to show the scanning progress.
+    :param workers: The number of files analyzed concurrently.
+    :param similarity_threshold: The minimum similarity (0 to 1) for a file to reuse the summary of a near-duplicate.
+    :param delta_prompts: Update the reused summary with a prompt describing only the differences between the files.
+    :param content_hashes: A dictionary updated with the hash of the contents of each file, keyed by file path.
     :return: A dictionary with the file names as keys and their descriptions as values.
     """
-    directory = pathlib.Path(path)
+    manifest = build_file_manifest(path, ignore_file_path)
 
-    files = {}
-    for item in directory.iterdir():
-        if item.is_file() and is_allowed_file(item.name, ignore_file_path):
-            file_metadata = read_file(f"{path}/{item.name}")
-            files[file_metadata["name"]] = file_metadata["metadata"]["description"]
-            if progress_bar:
-                progress_bar.next()
-        elif item.is_dir() and is_allowed_folder(item.name, ignore_file_path):
-            files_in_dir = list_directory_contents(f"{path}/{item.name}", progress_bar, ignore_file_path)
-            files[item.name] = files_in_dir
+    stats = {}
+    contents = analyze_manifest(path, manifest, progress_bar, workers, similarity_threshold=similarity_threshold,
+                                delta_prompts=delta_prompts, stats=stats, content_hashes=content_hashes)
+    if stats:
+        print(f"\n{format_duplicate_stats(stats)}")
 
-    return files
+    return contents
 
 
-def scan_git_repo(repo_path: str, ignore_file_path: str | None = None) -> dict:
+def scan_git_repo(repo_path: str, ignore_file_path: str | None = None, workers: int = DEFAULT_WORKERS,
+                  similarity_threshold: float | None = None, delta_prompts: bool = False,
+                  content_hashes: dict | None = None) -> dict:
     """
     Scan the Git repository for all files and directories.
     :param ignore_file_path: Path to the ignore file.
     :param repo_path: The path to the Git repository.
+    :param workers: The number of files analyzed concurrently.
+    :param similarity_threshold: The minimum similarity (0 to 1) for a file to reuse the summary of a near-duplicate.
+    :param delta_prompts: Update the reused summary with a prompt describing only the differences between the files.
+    :param content_hashes: A dictionary updated with the hash of the contents of each file, keyed by file path.
     :return: A list of files and directories and their contents in the repository.
     """
     local_path = repo_path
+    temp_root = None
 
     # Check if the input is a GitHub URL
     if is_github_url(repo_path):
         # Clone the GitHub repository
         local_path = clone_github_repo(repo_path, GITHUB_AUTH_TOKEN)
+        temp_root = get_clone_root(repo_path, local_path)
 
     # Check if the provided path is a valid directory
     if not pathlib.Path(local_path).is_dir():
@@ -112,20 +256,65 @@ def scan_git_repo(repo_path: str, ignore_file_path: str | None = None) -> dict:
                                suffix='%(index)d/%(max)d files (%(percent).1f%%)')
 
     # List all files and directories in the repo
-    contents = list_directory_contents(local_path, progress_bar, ignore_file_path)
+    contents = list_directory_contents(local_path, progress_bar, ignore_file_path, workers=workers,
+                                       similarity_threshold=similarity_threshold, delta_prompts=delta_prompts,
+                                       content_hashes=content_hashes)
 
     # Clean up temporary directory
-    parent_dir = os.path.dirname(local_path)
-    delete_dir(parent_dir)
+    if temp_root:
+        delete_dir(temp_root)
 
     return contents
 
 
-def scan_repo(repo_path: str, progress_bar: ChargingBar = None, ignore_file_path: str | None = None) -> dict:
+def scan_archive(repo_path: str, ignore_file_path: str | None = None, workers: int = DEFAULT_WORKERS,
+                 ref: str = "HEAD", similarity_threshold: float | None = None, delta_prompts: bool = False,
+                 content_hashes: dict | None = None) -> dict:
+    """
+    Scan a tar/zip archive or a bare Git repository without extracting it to disk.
+    File contents are streamed from the archive or the Git object database straight into the analyzer.
+    :param repo_path: The path to the archive or bare Git repository.
+    :param ignore_file_path: Path to the ignore file.
+    :param workers: The number of files analyzed concurrently.
+    :param ref: The branch, tag or commit to scan (bare Git repositories only).
+    :param similarity_threshold: The minimum similarity (0 to 1) for a file to reuse the summary of a near-duplicate.
+    :param delta_prompts: Update the reused summary with a prompt describing only the differences between the files.
+    :param content_hashes: A dictionary updated with the hash of the contents of each file, keyed by file path.
+    :return: A list of files and directories and their contents in the repository.
+    """
+    source = open_source(repo_path, ref, ignore_file_path)
+    analyzer = CodeAnalyzer()
+
+    try:
+        manifest = source.manifest()
+        print(f"Found {len(manifest)} file{"s" if len(manifest) != 1 else ""} to analyze.")
+
+        progress_bar = ChargingBar(f"Scanning repository: {pathlib.Path(repo_path).name or repo_path}", max=len(manifest),
+                                   suffix='%(index)d/%(max)d files (%(percent).1f%%)')
+
+        stats = {}
+        contents = analyze_source(source, manifest, progress_bar, workers, analyzer=analyzer,
+                                  similarity_threshold=similarity_threshold, delta_prompts=delta_prompts, stats=stats,
+                                  content_hashes=content_hashes)
+        if stats:
+            print(f"\n{format_duplicate_stats(stats)}")
+    finally:
+        source.close()
+
+    return contents
+
+
+def scan_repo(repo_path: str, progress_bar: ChargingBar = None, ignore_file_path: str | None = None,
+              workers: int = DEFAULT_WORKERS, similarity_threshold: float | None = None,
+              delta_prompts: bool = False, content_hashes: dict | None = None) -> dict:
     """
     Scan the GitHub repository for all files and directories.
     :param repo_path: The path to the Git repository.
     :param progress_bar: A progress bar to show the scanning progress.
+    :param workers: The number of files analyzed concurrently.
+    :param similarity_threshold: The minimum similarity (0 to 1) for a file to reuse the summary of a near-duplicate.
+    :param delta_prompts: Update the reused summary with a prompt describing only the differences between the files.
+    :param content_hashes: A dictionary updated with the hash of the contents of each file, keyed by file path.
     :return: A list of files and directories and their contents in the repository.
     """
     # Check if the provided path is a valid directory
@@ -133,9 +322,15 @@ def scan_repo(repo_path: str, progress_bar: ChargingBar = None, ignore_file_path
         if not pathlib.Path(repo_path).is_file():
             raise ValueError(f"The provided path is not a valid directory: {repo_path}")
 
+        if content_hashes is not None:
+            with open(repo_path, "rb") as f:
+                content_hashes[repo_path] = hash_content(f.read())
+
         return { f"{repo_path}": read_file(repo_path)["metadata"]["description"] }
 
     # List all files and directories in the repo
-    contents = list_directory_contents(repo_path, progress_bar, ignore_file_path)
+    contents = list_directory_contents(repo_path, progress_bar, ignore_file_path, workers=workers,
+                                       similarity_threshold=similarity_threshold, delta_prompts=delta_prompts,
+                                       content_hashes=content_hashes)
 
     return contents
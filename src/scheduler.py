@@ -0,0 +1,161 @@
+import heapq
+import pathlib
+from concurrent.futures import Executor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable
+
+from progress.bar import ChargingBar
+from .get_code_summary import ERROR_PREFIX, is_failed_description
+from .utils import is_allowed_file, is_allowed_folder
+
+
+def build_file_manifest(path=".", ignore_file_path: str | None = None, prefix: str = "") -> list[dict]:
+    """
+    Walk a directory and list every file that will be analyzed, along with its size.
+    :param path: The path to the directory to scan.
+    :param ignore_file_path: Path to the ignore file.
+    :param prefix: Relative path of the directory from the repository root (used while recursing).
+    :return: A list of {"path": relative posix path, "size": size in bytes} entries, in directory walk order.
+    """
+    directory = pathlib.Path(path)
+
+    manifest = []
+    for item in directory.iterdir():
+        if item.is_file() and is_allowed_file(item.name, ignore_file_path):
+            manifest.append({"path": f"{prefix}{item.name}", "size": item.stat().st_size})
+        elif item.is_dir() and is_allowed_folder(item.name, ignore_file_path):
+            manifest.extend(build_file_manifest(f"{path}/{item.name}", ignore_file_path, f"{prefix}{item.name}/"))
+
+    return manifest
+
+
+def order_by_cost(manifest: list[dict]) -> list[dict]:
+    """
+    Order the analysis queue longest-processing-time-first.
+    The request cost is dominated by the prompt size, so the file size is used as the cost estimate.
+    Big files are started first and small files fill the gaps at the end of the run.
+    :param manifest: The file manifest, as returned by build_file_manifest.
+    :return: A new list with the most expensive files first. Ties keep the walk order.
+    """
+    return sorted(manifest, key=lambda entry: entry["size"], reverse=True)
+
+
+def simulate_makespan(costs: list[float], workers: int) -> float:
+    """
+    Simulate running jobs in the given order on a pool of workers, each job going to the first free worker.
+    :param costs: The cost (duration) of every job, in queue order.
+    :param workers: The number of workers in the pool.
+    :return: The total wall time until the last job finishes.
+    """
+    finish_times = [0.0] * max(1, workers)
+    for cost in costs:
+        heapq.heappush(finish_times, heapq.heappop(finish_times) + cost)
+
+    return max(finish_times)
+
+
+def insert_into_tree(tree: dict, relative_path: str, value) -> None:
+    """
+    Store a value in a nested context dictionary, creating the folders on the way.
+    :param tree: The context dictionary to update.
+    :param relative_path: The posix path of the file, relative to the repository root.
+    :param value: The value to store for the file.
+    :return: None
+    """
+    *folders, name = relative_path.split("/")
+    for folder in folders:
+        tree = tree.setdefault(folder, {})
+    tree[name] = value
+
+
+def run_jobs(manifest: list[dict], analyze: Callable[[dict], str], workers: int = 1,
+             progress_bar: ChargingBar = None, executor: Executor | None = None,
+             match_duplicate: Callable[[dict], tuple[str, float] | None] | None = None,
+             analyze_delta: Callable[[dict, dict, str], str] | None = None,
+             on_queued: Callable[[], None] | None = None) -> dict:
+    """
+    Analyze every file of the manifest on a pool of workers, biggest files first.
+    :param manifest: The file manifest, as returned by build_file_manifest.
+    :param analyze: A function taking a manifest entry and returning the file description.
+    :param workers: The number of concurrent analysis requests (ignored when an executor is given).
+    :param progress_bar: A progress bar to show the analysis progress.
+    :param executor: An existing executor to submit the jobs to.
+    :param match_duplicate: A function taking a manifest entry and returning the path of the file it's a near-duplicate
+        of (and the similarity), or None. It's called in queue order, on the calling thread, while the files before
+        it are being analyzed. Files it fails on are analyzed normally. Near-duplicates reuse the description of their original instead of being analyzed.
+    :param analyze_delta: A function taking a near-duplicate entry, its original entry and the original description,
+        and returning the description of the near-duplicate. If not provided, the original description is reused as is.
+        Near-duplicates of a file whose analysis failed are analyzed normally.
+    :param on_queued: A function called once every file is queued, before waiting for the last jobs to finish.
+        With a shared executor, it lets the caller queue more work while the end of this run is being analyzed.
+    :return: The file descriptions nested in the same folder structure as the repository.
+    """
+    own_executor = executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor(max_workers=max(1, workers))
+
+    contents = {}
+    futures = {}
+    # Descriptions of the analyzed files that near-duplicates can reuse
+    originals = {}
+    # Near-duplicates waiting for their original to be analyzed
+    dependents = {}
+
+    def submit(function: Callable, entry: dict, *args) -> None:
+        futures[executor.submit(function, entry, *args)] = entry
+
+    def finish(entry: dict, description: str) -> None:
+        insert_into_tree(contents, entry["path"], description)
+        if progress_bar:
+            progress_bar.next()
+
+    def resolve(dependent: dict, original: dict, description: str) -> None:
+        if is_failed_description(description):
+            # Don't spread the error of the original to its near-duplicates
+            submit(analyze, dependent)
+        elif analyze_delta:
+            submit(analyze_delta, dependent, original, description)
+        else:
+            finish(dependent, description)
+
+    def collect(done: set) -> None:
+        for future in done:
+            entry = futures.pop(future)
+            try:
+                description = future.result()
+            except Exception as e:
+                description = f"{ERROR_PREFIX}: {str(e)}"
+            finish(entry, description)
+
+            originals[entry["path"]] = (entry, description)
+            for dependent in dependents.pop(entry["path"], []):
+                resolve(dependent, entry, description)
+
+    try:
+        for entry in order_by_cost(manifest):
+            try:
+                match = match_duplicate(entry) if match_duplicate else None
+            except Exception:
+                # Analyze the file normally, so its error is reported like any other analysis error
+                match = None
+
+            if match is None:
+                submit(analyze, entry)
+            elif match[0] in originals:
+                resolve(entry, *originals[match[0]])
+            else:
+                dependents.setdefault(match[0], []).append(entry)
+
+            # Collect the jobs done in the meantime without waiting
+            collect({future for future in futures if future.done()})
+
+        if on_queued:
+            on_queued()
+
+        while futures:
+            done, _ = wait(set(futures), return_when=FIRST_COMPLETED)
+            collect(done)
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+    return contents
@@ -0,0 +1,156 @@
+import hashlib
+import random
+import re
+from typing import Callable
+
+from .scheduler import order_by_cost
+
+# Large prime for the universal hash permutations of the MinHash signatures
+MERSENNE_PRIME = (1 << 61) - 1
+DEFAULT_NUM_PERM = 64
+DEFAULT_BANDS = 16
+DEFAULT_SHINGLE_SIZE = 5
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+def shingles(text: str, size: int = DEFAULT_SHINGLE_SIZE) -> set[str]:
+    """
+    Split a text into overlapping sequences of tokens. Whitespace and formatting changes don't change the shingles.
+    :param text: The text to split.
+    :param size: The number of tokens of each shingle.
+    :return: The set of shingles of the text.
+    """
+    tokens = TOKEN_PATTERN.findall(text)
+    if len(tokens) <= size:
+        return {" ".join(tokens)} if tokens else set()
+
+    return {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+class NearDuplicateIndex:
+    """
+    MinHash signatures of the analyzed files, bucketed with locality sensitive hashing so a file only has to be
+    compared with the files it shares a band with.
+    """
+
+    def __init__(self, threshold: float, num_perm: int = DEFAULT_NUM_PERM, bands: int = DEFAULT_BANDS,
+                 seed: int = 1) -> None:
+        if num_perm % bands:
+            raise ValueError(f"The number of permutations ({num_perm}) must be a multiple of the number of bands ({bands})")
+
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = random.Random(seed)
+        self.permutations = [(rng.randint(1, MERSENNE_PRIME - 1), rng.randint(0, MERSENNE_PRIME - 1)) for _ in range(num_perm)]
+        self.signatures = {}
+        self.buckets = {}
+
+    def signature(self, text: str) -> tuple[int, ...] | None:
+        """
+        Compute the MinHash signature of a text.
+        :param text: The text to sign.
+        :return: The signature, or None if the text has no tokens.
+        """
+        hashes = [int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+                  for shingle in shingles(text)]
+        if not hashes:
+            return None
+
+        return tuple(min((a * h + b) % MERSENNE_PRIME for h in hashes) for a, b in self.permutations)
+
+    def band_keys(self, signature: tuple[int, ...]) -> list[tuple]:
+        return [(band, signature[band * self.rows:(band + 1) * self.rows]) for band in range(self.bands)]
+
+    def add(self, key: str, signature: tuple[int, ...]) -> None:
+        self.signatures[key] = signature
+        for band_key in self.band_keys(signature):
+            self.buckets.setdefault(band_key, []).append(key)
+
+    def query(self, signature: tuple[int, ...]) -> tuple[str, float] | None:
+        """
+        Find the most similar indexed file.
+        :param signature: The signature of the file to look up.
+        :return: The key of the most similar file and the estimated similarity, or None if no file is above the threshold.
+        """
+        candidates = {key for band_key in self.band_keys(signature) for key in self.buckets.get(band_key, [])}
+
+        best = None
+        for key in candidates:
+            other = self.signatures[key]
+            similarity = sum(1 for a, b in zip(signature, other) if a == b) / len(signature)
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (key, similarity)
+
+        return best
+
+
+class NearDuplicateFinder:
+    """
+    Decides, one file at a time, whether a file is a near-duplicate of a file visited before.
+    Files have to be visited in analysis order: a file that isn't close to an already visited file is analyzed
+    normally and added to the index, the others reuse the summary of their closest match.
+    """
+
+    def __init__(self, read: Callable[[dict], bytes], threshold: float) -> None:
+        self.read = read
+        self.index = NearDuplicateIndex(threshold)
+        self.duplicates = {}
+
+    def match(self, entry: dict) -> tuple[str, float] | None:
+        """
+        Look up a file in the index, and add it to the index if it isn't a near-duplicate.
+        :param entry: The manifest entry of the file.
+        :return: The path of the original file and the estimated similarity, or None if the file isn't a near-duplicate.
+        """
+        signature = self.index.signature(self.read(entry).decode("utf-8", errors="ignore"))
+        if signature is None:
+            return None
+
+        match = self.index.query(signature)
+        if match:
+            self.duplicates[entry["path"]] = match
+        else:
+            self.index.add(entry["path"], signature)
+
+        return match
+
+
+def find_near_duplicates(manifest: list[dict], read: Callable[[dict], bytes], threshold: float) -> dict:
+    """
+    Find the files that are almost identical to another file of the manifest.
+    Files are visited in analysis order (biggest first).
+    :param manifest: The file manifest, as returned by build_file_manifest.
+    :param read: A function taking a manifest entry and returning the file contents.
+    :param threshold: The minimum estimated similarity (0 to 1) for a file to be considered a near-duplicate.
+    :return: A dictionary with the paths of the near-duplicates as keys and (path of the original, similarity) as values.
+    """
+    finder = NearDuplicateFinder(read, threshold)
+    for entry in order_by_cost(manifest):
+        finder.match(entry)
+
+    return finder.duplicates
+
+
+def summarize_duplicates(manifest: list[dict], duplicates: dict, threshold: float) -> dict:
+    """
+    Get the near-duplicate stats of a run.
+    :param manifest: The file manifest, as returned by build_file_manifest.
+    :param duplicates: The near-duplicates, as returned by find_near_duplicates.
+    :param threshold: The similarity threshold used.
+    :return: A dictionary with the threshold, number of files, number of near-duplicates, hit rate and average similarity.
+    """
+    similarities = [similarity for _, similarity in duplicates.values()]
+    return {
+        "threshold": threshold,
+        "files": len(manifest),
+        "near_duplicates": len(duplicates),
+        "hit_rate": len(duplicates) / len(manifest) if manifest else 0.0,
+        "average_similarity": sum(similarities) / len(similarities) if similarities else 0.0,
+    }
+
+
+def format_duplicate_stats(stats: dict) -> str:
+    return (f"Near-duplicates: {stats['near_duplicates']}/{stats['files']} files ({100 * stats['hit_rate']:.1f}%) "
+            f"reused a summary at similarity >= {stats['threshold']:.2f} (average {stats['average_similarity']:.2f})")
@@ -0,0 +1,223 @@
+import os
+import pathlib
+import tarfile
+import threading
+import zipfile
+
+from git import Repo
+from .utils import is_allowed_file, is_allowed_folder
+
+# Maximum size of the files kept in memory while streaming a compressed tar archive
+DEFAULT_TAR_BUFFER_SIZE = 64 * 1024 * 1024
+
+ARCHIVE_EXTENSIONS = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz", ".zip")
+
+
+def is_archive(path: str) -> bool:
+    """
+    Check if the given path is a tar or zip archive.
+    :param path: The path to check.
+    :return: True if the path is an archive file, False otherwise.
+    """
+    return isinstance(path, str) and path.lower().endswith(ARCHIVE_EXTENSIONS) and os.path.isfile(path)
+
+
+def is_bare_repo(path: str) -> bool:
+    """
+    Check if the given path is a bare Git repository (a repository without a working tree, like a mirror).
+    :param path: The path to check.
+    :return: True if the path is a bare Git repository, False otherwise.
+    """
+    if not isinstance(path, str):
+        return False
+
+    directory = pathlib.Path(path)
+    return (directory / "HEAD").is_file() and (directory / "objects").is_dir() and (directory / "refs").is_dir()
+
+
+def is_allowed_path(relative_path: str, ignore_file_path: str | None = None) -> bool:
+    """
+    Check if a file is allowed based on its name and the names of the folders it's in.
+    :param relative_path: The posix path of the file, relative to the repository root.
+    :param ignore_file_path: Path to the ignore file.
+    :return: True if the file is allowed, False otherwise.
+    """
+    *folders, name = relative_path.split("/")
+    return all(is_allowed_folder(folder, ignore_file_path) for folder in folders) and is_allowed_file(name, ignore_file_path)
+
+
+def strip_common_root(paths: list[str]) -> str:
+    """
+    Find the single top-level folder shared by all paths, as found in release tarballs (e.g. project-1.2.0/).
+    :param paths: The posix paths of the files in the archive.
+    :return: The prefix to strip (including the trailing slash), or an empty string if there is none.
+    """
+    roots = {path.split("/")[0] for path in paths}
+    if len(roots) == 1 and all("/" in path for path in paths):
+        return f"{roots.pop()}/"
+
+    return ""
+
+
+class TarSource:
+    """
+    Files of a tar archive (optionally compressed), read on demand. Nothing is written to disk.
+    Plain tar archives are read by seeking to each member. Compressed tar archives can't be seeked cheaply, so their
+    contents are streamed: reading a file decompresses the archive up to it, and the files passed on the way that
+    haven't been read yet are kept in a buffer of bounded size. Once the buffer is full, they'll be read again from a
+    new pass over the archive.
+    """
+
+    def __init__(self, archive_path: str, ignore_file_path: str | None = None,
+                 buffer_size: int = DEFAULT_TAR_BUFFER_SIZE) -> None:
+        self.archive_path = archive_path
+        self.buffer_size = buffer_size
+        # Reading from the same archive handle isn't thread safe
+        self.lock = threading.Lock()
+
+        try:
+            self.archive = tarfile.open(archive_path, "r:")
+        except tarfile.ReadError:
+            self.archive = None
+
+        # The first pass only reads the member headers
+        members = {}
+        self.positions = {}
+        stream = None if self.archive else tarfile.open(archive_path, "r|*")
+        for position, member in enumerate(self.archive.getmembers() if self.archive else stream):
+            name = member.name.removeprefix("./")
+            if member.isfile() and is_allowed_path(name, ignore_file_path):
+                members[name] = member
+                self.positions[member.name] = position
+        if stream:
+            stream.close()
+
+        prefix = strip_common_root(list(members.keys()))
+        self.members = {name.removeprefix(prefix): member for name, member in members.items()}
+
+        self.stream = None
+        self.position = 0
+        self.buffer = {}
+        self.buffered_bytes = 0
+        self.unread = set(self.positions.keys())
+
+    def manifest(self) -> list[dict]:
+        return [{"path": name, "size": member.size} for name, member in self.members.items()]
+
+    def read(self, relative_path: str) -> bytes:
+        member = self.members[relative_path]
+        with self.lock:
+            if self.archive:
+                return self.archive.extractfile(member.name).read()
+
+            return self._read_from_stream(member.name)
+
+    def _read_from_stream(self, member_name: str) -> bytes:
+        self.unread.discard(member_name)
+        if member_name in self.buffer:
+            data = self.buffer.pop(member_name)
+            self.buffered_bytes -= len(data)
+            return data
+
+        # The member was already passed, start a new pass over the archive
+        if self.stream is None or self.positions[member_name] < self.position:
+            if self.stream:
+                self.stream.close()
+            self.stream = tarfile.open(self.archive_path, "r|*")
+            self.position = 0
+
+        while True:
+            member = self.stream.next()
+            if member is None:
+                raise ValueError(f"File not found in archive: {member_name}")
+            self.position += 1
+
+            if member.name == member_name:
+                return self.stream.extractfile(member).read()
+
+            # Keep the files that will be read later, as long as the buffer isn't full
+            if member.name in self.unread and member.name not in self.buffer \
+                    and self.buffered_bytes + member.size <= self.buffer_size:
+                self.buffer[member.name] = self.stream.extractfile(member).read()
+                self.buffered_bytes += member.size
+
+    def close(self) -> None:
+        if self.archive:
+            self.archive.close()
+        if self.stream:
+            self.stream.close()
+        self.buffer = {}
+
+
+class ZipSource:
+    """
+    Files of a zip archive, decompressed on demand. Nothing is written to disk.
+    """
+
+    def __init__(self, archive_path: str, ignore_file_path: str | None = None) -> None:
+        self.archive = zipfile.ZipFile(archive_path)
+        # Reading from the same archive handle isn't thread safe
+        self.lock = threading.Lock()
+        self.members = {}
+        for info in self.archive.infolist():
+            name = info.filename.removeprefix("./")
+            if not info.is_dir() and is_allowed_path(name, ignore_file_path):
+                self.members[name] = info
+
+        prefix = strip_common_root(list(self.members.keys()))
+        self.members = {name.removeprefix(prefix): info for name, info in self.members.items()}
+
+    def manifest(self) -> list[dict]:
+        return [{"path": name, "size": info.file_size} for name, info in self.members.items()]
+
+    def read(self, relative_path: str) -> bytes:
+        with self.lock:
+            return self.archive.read(self.members[relative_path])
+
+    def close(self) -> None:
+        self.archive.close()
+
+
+class GitTreeSource:
+    """
+    Files of a Git repository at a given ref, read straight from the object database. No checkout is made,
+    so it works with bare repositories and mirrors.
+    """
+
+    def __init__(self, repo_path: str, ref: str = "HEAD", ignore_file_path: str | None = None) -> None:
+        self.repo = Repo(repo_path)
+        # The object database talks to a single `git cat-file` process, which isn't thread safe
+        self.lock = threading.Lock()
+        self.blobs = {}
+        for item in self.repo.commit(ref).tree.traverse():
+            if item.type == "blob" and is_allowed_path(item.path, ignore_file_path):
+                self.blobs[item.path] = item
+
+    def manifest(self) -> list[dict]:
+        return [{"path": path, "size": blob.size} for path, blob in self.blobs.items()]
+
+    def read(self, relative_path: str) -> bytes:
+        with self.lock:
+            return self.blobs[relative_path].data_stream.read()
+
+    def close(self) -> None:
+        self.repo.close()
+
+
+def open_source(repo_path: str, ref: str = "HEAD", ignore_file_path: str | None = None):
+    """
+    Open an archive or a bare Git repository for reading.
+    :param repo_path: The path to the archive or bare Git repository.
+    :param ref: The branch, tag or commit to read (bare Git repositories only).
+    :param ignore_file_path: Path to the ignore file.
+    :return: A source exposing manifest(), read(relative_path) and close().
+    """
+    if is_archive(repo_path):
+        if repo_path.lower().endswith(".zip"):
+            return ZipSource(repo_path, ignore_file_path)
+        return TarSource(repo_path, ignore_file_path)
+
+    if is_bare_repo(repo_path):
+        return GitTreeSource(repo_path, ref, ignore_file_path)
+
+    raise ValueError(f"The provided path is not an archive or a bare Git repository: {repo_path}")
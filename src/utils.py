@@ -1,3 +1,4 @@
+import hashlib
 import os
 import pathlib
 import re
@@ -45,6 +46,15 @@ def count_processable_files(path=".", ignore_file_path: str | None = None) -> tu
     return file_count, folder_count
 
 
+def hash_content(data: bytes) -> str:
+    """
+    Hash the contents of a file, to tell whether it changed since it was documented.
+    :param data: The file contents.
+    :return: The SHA-256 hex digest of the contents.
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
 def delete_dir(path: str) -> None:
     dir_path = pathlib.Path(path)
     if dir_path.exists():
@@ -0,0 +1,211 @@
+import hashlib
+import os
+import pathlib
+import sqlite3
+from datetime import datetime, timezone
+
+from .generate_wiki import wiki_page_name
+from .get_code_summary import MODEL_NAME
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS pages (
+        path TEXT PRIMARY KEY,
+        summary TEXT NOT NULL,
+        summary_hash TEXT NOT NULL,
+        content_hash TEXT NOT NULL,
+        model TEXT NOT NULL,
+        created_at TEXT NOT NULL
+    )
+"""
+
+# Pages written by the exports of the bundle, so an export only ever removes the pages it created itself
+EXPORTS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS exports (
+        output_path TEXT NOT NULL,
+        path TEXT NOT NULL,
+        PRIMARY KEY (output_path, path)
+    )
+"""
+
+
+def hash_summary(summary: str) -> str:
+    return hashlib.sha256(summary.encode("utf-8")).hexdigest()
+
+
+def flatten_context(context: dict, prefix: str = "") -> dict:
+    """
+    Flatten a nested context dictionary.
+    :param context: List of files and directories and their contents in the repository.
+    :param prefix: Relative path of the folder the context belongs to (used while recursing).
+    :return: A dictionary with the posix path of each file as keys and their descriptions as values.
+    """
+    pages = {}
+    for item in context.keys():
+        if isinstance(context[item], dict):
+            pages.update(flatten_context(context[item], f"{prefix}{item}/"))
+        elif isinstance(context[item], str):
+            pages[f"{prefix}{item}"] = context[item]
+
+    return pages
+
+
+def connect(bundle_path: str) -> sqlite3.Connection:
+    connection = sqlite3.connect(bundle_path)
+    connection.execute(SCHEMA)
+    connection.execute(EXPORTS_SCHEMA)
+    return connection
+
+
+def write_bundle(context: dict, bundle_path: str, prefix: str = "", model: str = MODEL_NAME,
+                 content_hashes: dict | None = None) -> None:
+    """
+    Save the Wiki pages of the repository in a single SQLite bundle, keyed by file path.
+    Pages whose summary didn't change keep their timestamp. When a prefix is given, the pages under that prefix
+    whose files are gone are removed; the pages of other prefixes are never touched.
+    :param context: List of files and directories and their contents in the repository.
+    :param bundle_path: The path to the bundle file. It's created if it doesn't exist.
+    :param prefix: A path prefix for the pages (the repository name followed by a slash), so several repositories
+        can share a bundle. Without a prefix, pages are only added or updated.
+    :param model: The name of the model that generated the summaries.
+    :param content_hashes: The hash of the contents of each documented file, keyed by file path (without the prefix).
+        Files without a hash are stored with an empty one.
+    :return: None
+    """
+    pages = flatten_context(context, prefix)
+    content_hashes = content_hashes or {}
+    created_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+    with connect(bundle_path) as connection:
+        connection.executemany(
+            """
+                INSERT INTO pages (path, summary, summary_hash, content_hash, model, created_at) VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (path) DO UPDATE SET
+                    summary = excluded.summary,
+                    summary_hash = excluded.summary_hash,
+                    content_hash = excluded.content_hash,
+                    model = excluded.model,
+                    created_at = excluded.created_at
+                WHERE summary_hash != excluded.summary_hash OR content_hash != excluded.content_hash
+                    OR model != excluded.model
+            """,
+            [
+                (path, summary, hash_summary(summary), content_hashes.get(path.removeprefix(prefix), ""), model, created_at)
+                for path, summary in pages.items()
+            ],
+        )
+
+        if prefix:
+            existing = connection.execute(
+                "SELECT path FROM pages WHERE substr(path, 1, ?) = ?", (len(prefix), prefix)
+            ).fetchall()
+            connection.executemany(
+                "DELETE FROM pages WHERE path = ?",
+                [(path,) for (path,) in existing if path not in pages],
+            )
+    connection.close()
+
+
+def read_bundle(bundle_path: str, prefix: str = "") -> dict:
+    """
+    Read the page summaries of a bundle.
+    :param bundle_path: The path to the bundle file.
+    :param prefix: Only return the pages under this path prefix.
+    :return: A dictionary with the file paths as keys and metadata objects (summary, summary_hash, content_hash,
+        model, created_at) as values. The content hash is the hash of the documented file, so callers can tell
+        whether it changed since.
+    """
+    if not os.path.isfile(bundle_path):
+        raise ValueError(f"The provided path is not a valid bundle: {bundle_path}")
+
+    with connect(bundle_path) as connection:
+        rows = connection.execute(
+            "SELECT path, summary, summary_hash, content_hash, model, created_at FROM pages "
+            "WHERE substr(path, 1, ?) = ? ORDER BY path",
+            (len(prefix), prefix),
+        ).fetchall()
+    connection.close()
+
+    return {
+        path: {
+            "summary": summary,
+            "summary_hash": summary_hash,
+            "content_hash": content_hash,
+            "model": model,
+            "created_at": created_at,
+        }
+        for path, summary, summary_hash, content_hash, model, created_at in rows
+    }
+
+
+def remove_empty_folders(folder_path: str, output_path: str) -> None:
+    """
+    Remove a folder left empty by an export, and its parents up to the output directory.
+    Hidden folders (like the .git folder of a Wiki checkout) are never removed.
+    :param folder_path: The folder a page was removed from.
+    :param output_path: The output directory of the export, which is kept.
+    :return: None
+    """
+    folder = pathlib.Path(folder_path)
+    output = pathlib.Path(output_path)
+    while folder != output and output in folder.parents and not folder.name.startswith(".") \
+            and folder.is_dir() and not any(folder.iterdir()):
+        folder.rmdir()
+        folder = folder.parent
+
+
+def export_bundle(bundle_path: str, output_path: str) -> tuple[int, int]:
+    """
+    Render the markdown Wiki pages of a bundle.
+    The export is incremental: pages already on disk with the same content are not written again, and the pages
+    written by a previous export to the same directory that are no longer in the bundle are removed. Other files of
+    the output directory (like the Home page of a Wiki checkout) are never touched.
+    :param bundle_path: The path to the bundle file.
+    :param output_path: The path to the output directory where the wiki pages will be saved (in .md format).
+    :return: The number of pages written and the number of pages removed.
+    """
+    written = 0
+    expected = set()
+    for path, page in read_bundle(bundle_path).items():
+        if not page["summary"]:
+            continue
+
+        *folders, name = path.split("/")
+        folder_path = os.path.join(output_path, *folders)
+        file_path = os.path.join(folder_path, wiki_page_name(name))
+        expected.add("/".join([*folders, wiki_page_name(name)]))
+
+        if os.path.isfile(file_path):
+            with open(file_path, "r", encoding="utf-8") as wiki_file:
+                if hash_summary(wiki_file.read()) == page["summary_hash"]:
+                    continue
+
+        os.makedirs(folder_path, exist_ok=True)
+        with open(file_path, "w", encoding="utf-8") as wiki_file:
+            wiki_file.write(page["summary"])
+        written += 1
+
+    removed = 0
+    export_path = os.path.abspath(output_path)
+    with connect(bundle_path) as connection:
+        exported = {path for (path,) in connection.execute(
+            "SELECT path FROM exports WHERE output_path = ?", (export_path,)
+        ).fetchall()}
+
+        for path in sorted(exported - expected):
+            file_path = os.path.join(export_path, *path.split("/"))
+            if os.path.isfile(file_path):
+                os.remove(file_path)
+                removed += 1
+                remove_empty_folders(os.path.dirname(file_path), export_path)
+
+        connection.executemany(
+            "DELETE FROM exports WHERE output_path = ? AND path = ?",
+            [(export_path, path) for path in exported - expected],
+        )
+        connection.executemany(
+            "INSERT OR IGNORE INTO exports (output_path, path) VALUES (?, ?)",
+            [(export_path, path) for path in expected - exported],
+        )
+    connection.close()
+
+    return written, removed
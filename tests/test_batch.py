@@ -0,0 +1,159 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import tarfile
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+from git import Repo
+from src.batch import read_repos_file, get_repo_name, scan_repos
+
+
+class TestBatch(unittest.TestCase):
+    def test_read_repos_file(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            repos_file = os.path.join(temp_dir, "repos.txt")
+            with open(repos_file, "w") as f:
+                f.write("# Services\nhttps://github.com/username/service-a\n\n  path/to/service-b  \n")
+
+            self.assertEqual(read_repos_file(repos_file), ["https://github.com/username/service-a", "path/to/service-b"])
+
+    def test_get_repo_name(self):
+        self.assertEqual(get_repo_name("https://github.com/username/service-a"), "service-a")
+        self.assertEqual(get_repo_name("https://github.com/username/service-a.git"), "service-a")
+        self.assertEqual(get_repo_name("path/to/service-b/"), "service-b")
+        self.assertEqual(get_repo_name("path/to/service-c-1.0.tar.gz"), "service-c-1.0")
+        self.assertEqual(get_repo_name("path/to/service-d.git"), "service-d")
+
+    @patch('src.batch.clone_github_repo')
+    @patch('src.get_code_summary.CodeAnalyzer.analyze_code_block')
+    def test_scan_repos(self, mock_analyze_block, mock_clone):
+        mock_analyze_block.side_effect = lambda code, filename: f"Description of {filename}"
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            local_repo = os.path.join(temp_dir, "service-b")
+            os.makedirs(os.path.join(local_repo, "pkg"))
+            with open(os.path.join(local_repo, "pkg", "handler.py"), "w") as f:
+                f.write("def handle(): pass")
+
+            clone_parent = os.path.join(temp_dir, "clone")
+            cloned_repo = os.path.join(clone_parent, "service-a")
+            os.makedirs(cloned_repo)
+            with open(os.path.join(cloned_repo, "main.py"), "w") as f:
+                f.write("print('hello')")
+            mock_clone.return_value = cloned_repo
+
+            output_path = os.path.join(temp_dir, "wiki")
+            stats = scan_repos(["https://github.com/username/service-a", local_repo, "missing/service-c"], output_path, workers=2)
+
+            with open(os.path.join(output_path, "service-a", "main.md")) as f:
+                self.assertEqual(f.read(), "Description of main.py")
+            with open(os.path.join(output_path, "service-b", "pkg", "handler.md")) as f:
+                self.assertEqual(f.read(), "Description of handler.py")
+
+            # The temporary clone is removed, the local repository is kept
+            self.assertFalse(os.path.exists(clone_parent))
+            self.assertTrue(os.path.exists(local_repo))
+
+        self.assertEqual(set(stats["repos"].keys()), {"service-a", "service-b"})
+        self.assertEqual(stats["repos"]["service-a"]["files"], 1)
+        self.assertEqual(stats["total"]["files"], 2)
+        self.assertEqual(stats["total"]["bytes"], len("print('hello')") + len("def handle(): pass"))
+
+    @patch('src.batch.generate_wiki')
+    @patch('src.batch.clone_github_repo')
+    @patch('src.get_code_summary.CodeAnalyzer.analyze_code_block')
+    def test_scan_repos_continues_after_failure(self, mock_analyze_block, mock_clone, mock_generate_wiki):
+        mock_analyze_block.return_value = "Description"
+        def generate_wiki(contents, output_path):
+            if output_path.endswith("service-a"):
+                raise OSError("Disk full")
+        mock_generate_wiki.side_effect = generate_wiki
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # A URL without owner is cloned directly into the temporary directory
+            temp_clone = os.path.join(temp_dir, "tmpabc123")
+            os.makedirs(temp_clone)
+            with open(os.path.join(temp_clone, "main.py"), "w") as f:
+                f.write("print('hello')")
+            mock_clone.return_value = temp_clone
+
+            local_repo = os.path.join(temp_dir, "service-b")
+            os.makedirs(local_repo)
+            with open(os.path.join(local_repo, "main.py"), "w") as f:
+                f.write("print('hello')")
+
+            stats = scan_repos(["https://github.com/service-a", local_repo], os.path.join(temp_dir, "wiki"))
+
+            # Only the clone is deleted, not the directory it was created in
+            self.assertFalse(os.path.exists(temp_clone))
+            self.assertTrue(os.path.exists(temp_dir))
+
+        self.assertEqual(list(stats["repos"].keys()), ["service-b"])
+        self.assertEqual(mock_generate_wiki.call_count, 2)
+
+    @patch('src.get_code_summary.CodeAnalyzer.analyze_code_block')
+    def test_scan_repos_overlaps_repositories(self, mock_analyze_block):
+        next_repo_started = threading.Event()
+        overlapped = []
+
+        def analyze_code_block(code, filename):
+            if filename == "slow.py":
+                # The last request of the first repository is still running when the next repository starts
+                overlapped.append(next_repo_started.wait(timeout=5))
+            else:
+                next_repo_started.set()
+            return f"Description of {filename}"
+        mock_analyze_block.side_effect = analyze_code_block
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            repos = []
+            for name, file_name in [("service-a", "slow.py"), ("service-b", "fast.py")]:
+                repos.append(os.path.join(temp_dir, name))
+                os.makedirs(repos[-1])
+                with open(os.path.join(repos[-1], file_name), "w") as f:
+                    f.write("print('hello')")
+
+            output_path = os.path.join(temp_dir, "wiki")
+            stats = scan_repos(repos, output_path, workers=2)
+
+            self.assertEqual(overlapped, [True])
+            with open(os.path.join(output_path, "service-a", "slow.md")) as f:
+                self.assertEqual(f.read(), "Description of slow.py")
+            self.assertEqual(list(stats["repos"].keys()), ["service-a", "service-b"])
+            self.assertEqual(stats["total"]["files"], 2)
+
+    @patch('src.get_code_summary.CodeAnalyzer.analyze_code_block')
+    def test_scan_repos_archives_and_bare_repos(self, mock_analyze_block):
+        mock_analyze_block.side_effect = lambda code, filename: f"Description of {filename}"
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            work_tree = os.path.join(temp_dir, "work")
+            os.makedirs(work_tree)
+            with open(os.path.join(work_tree, "main.py"), "w") as f:
+                f.write("print('hello')")
+            repo = Repo.init(work_tree)
+            repo.index.add(["main.py"])
+            repo.index.commit("Initial commit")
+            bare_repo = os.path.join(temp_dir, "service-a.git")
+            repo.clone(bare_repo, bare=True)
+            repo.close()
+
+            tarball = os.path.join(temp_dir, "service-b.tar.gz")
+            with tarfile.open(tarball, "w:gz") as archive:
+                archive.add(work_tree, arcname="service-b-1.0")
+
+            output_path = os.path.join(temp_dir, "wiki")
+            stats = scan_repos([bare_repo, tarball], output_path)
+
+            # Only the committed file is documented, not the internals of the bare repository
+            self.assertEqual(os.listdir(os.path.join(output_path, "service-a")), ["main.md"])
+            self.assertEqual(stats["repos"]["service-a"]["files"], 1)
+            with open(os.path.join(output_path, "service-b", "main.md")) as f:
+                self.assertEqual(f.read(), "Description of main.py")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,7 +5,8 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 import unittest
 from unittest.mock import patch, MagicMock, mock_open
 import subprocess
-from src.get_code_summary import CodeAnalyzer
+import json
+from src.get_code_summary import CodeAnalyzer, is_failed_description
 
 class TestGetCodeSummary(unittest.TestCase):
     @patch('requests.post')
@@ -36,6 +37,41 @@ class TestGetCodeSummary(unittest.TestCase):
 
         self.assertEqual(result, "Analysis timed out")
 
+    @patch('requests.post')
+    def test_analyze_delta(self, mock_post):
+        mock_response = MagicMock()
+        mock_response.json.return_value = {
+            "candidates": [
+                {"content": {"parts": [{"text": "# Overview\nUpdated description"}]}}
+            ]
+        }
+        mock_post.return_value = mock_response
+
+        analyzer = CodeAnalyzer()
+        result = analyzer.analyze_delta("def test(): return 2", "b.py", "def test(): return 1", "a.py", "# Overview\nOriginal")
+
+        self.assertEqual(result, "# Overview\nUpdated description")
+        prompt = json.loads(mock_post.call_args.kwargs["data"])["contents"][0]["parts"][0]["text"]
+        self.assertIn("+def test(): return 2", prompt)
+        self.assertIn("# Overview\nOriginal", prompt)
+
+        # Identical code reuses the original summary without calling the API
+        mock_post.reset_mock()
+        result = analyzer.analyze_delta("def test(): pass", "b.py", "def test(): pass", "a.py", "Original")
+        self.assertEqual(result, "Original")
+        mock_post.assert_not_called()
+
+        # API errors fall back to the original summary
+        mock_post.side_effect = Exception("API error")
+        result = analyzer.analyze_delta("def test(): return 2", "b.py", "def test(): return 1", "a.py", "Original")
+        self.assertEqual(result, "Original")
+
+    def test_is_failed_description(self):
+        self.assertTrue(is_failed_description("Analysis timed out"))
+        self.assertTrue(is_failed_description("Error during analysis: File not found"))
+        self.assertTrue(is_failed_description(""))
+        self.assertFalse(is_failed_description("# Overview\nTest description"))
+
     @patch('pathlib.Path.exists')
     @patch('pathlib.Path.stat')
     @patch('builtins.open', new_callable=mock_open, read_data="def test(): pass")
@@ -0,0 +1,64 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import tempfile
+import unittest
+from unittest.mock import patch
+from src.__main__ import main, save_wiki
+from src.utils import hash_content
+from src.wiki_bundle import read_bundle
+
+
+class TestMain(unittest.TestCase):
+    @patch('src.__main__.write_bundle')
+    @patch('src.__main__.generate_wiki')
+    def test_save_wiki(self, mock_generate_wiki, mock_write_bundle):
+        context = {"file1.py": "File 1 description"}
+
+        save_wiki(context, "output_path")
+        mock_generate_wiki.assert_called_once_with(context, "output_path")
+        mock_write_bundle.assert_not_called()
+
+        mock_generate_wiki.reset_mock()
+        save_wiki(context, "output_path", "wiki.db")
+        mock_write_bundle.assert_called_once()
+        mock_generate_wiki.assert_not_called()
+
+    @patch('src.get_code_summary.CodeAnalyzer.analyze_code_block')
+    def test_main_markdown_output(self, mock_analyze_block):
+        mock_analyze_block.side_effect = lambda code, filename: f"Description of {filename}"
+
+        with tempfile.TemporaryDirectory() as repo:
+            os.makedirs(os.path.join(repo, "pkg"))
+            with open(os.path.join(repo, "pkg", "module.py"), "w") as f:
+                f.write("x = 1")
+
+            with patch.object(sys, "argv", ["src", "--repo", repo, "--workers", "2"]):
+                main()
+
+            with open(os.path.join(repo, "wiki", "pkg", "module.md")) as f:
+                self.assertEqual(f.read(), "Description of module.py")
+
+    @patch('src.get_code_summary.CodeAnalyzer.analyze_code_block')
+    def test_main_bundle_output(self, mock_analyze_block):
+        mock_analyze_block.side_effect = lambda code, filename: f"Description of {filename}"
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            repo = os.path.join(temp_dir, "service")
+            os.makedirs(repo)
+            with open(os.path.join(repo, "main.py"), "w") as f:
+                f.write("print('hello')")
+            bundle_path = os.path.join(temp_dir, "wiki.db")
+
+            with patch.object(sys, "argv", ["src", "--repo", repo, "--bundle", bundle_path]):
+                main()
+
+            self.assertFalse(os.path.exists(os.path.join(repo, "wiki")))
+            pages = read_bundle(bundle_path)
+            self.assertEqual(list(pages.keys()), ["service/main.py"])
+            self.assertEqual(pages["service/main.py"]["content_hash"], hash_content(b"print('hello')"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,189 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock
+from src.scheduler import build_file_manifest, order_by_cost, simulate_makespan, insert_into_tree, run_jobs
+
+
+class TestScheduler(unittest.TestCase):
+    def test_build_file_manifest(self):
+        with tempfile.TemporaryDirectory() as repo:
+            os.makedirs(os.path.join(repo, "pkg"))
+            os.makedirs(os.path.join(repo, "node_modules"))
+            with open(os.path.join(repo, "main.py"), "w") as f:
+                f.write("print('hello')")
+            with open(os.path.join(repo, "pkg", "module.py"), "w") as f:
+                f.write("x = 1")
+            with open(os.path.join(repo, "node_modules", "lib.js"), "w") as f:
+                f.write("var x = 1;")
+            with open(os.path.join(repo, "logo.png"), "w") as f:
+                f.write("png")
+
+            manifest = build_file_manifest(repo)
+
+        self.assertEqual(sorted(manifest, key=lambda entry: entry["path"]), [
+            {"path": "main.py", "size": 14},
+            {"path": "pkg/module.py", "size": 5},
+        ])
+
+    def test_order_by_cost(self):
+        manifest = [
+            {"path": "small.py", "size": 10},
+            {"path": "huge.py", "size": 1000},
+            {"path": "medium_a.py", "size": 100},
+            {"path": "medium_b.py", "size": 100},
+        ]
+
+        ordered = order_by_cost(manifest)
+
+        self.assertEqual([entry["path"] for entry in ordered], ["huge.py", "medium_a.py", "medium_b.py", "small.py"])
+        # The original manifest is left untouched
+        self.assertEqual(manifest[0]["path"], "small.py")
+
+    def test_simulate_makespan(self):
+        # A long job at the tail of the queue runs alone at the end
+        self.assertEqual(simulate_makespan([1, 1, 1, 1, 4], 2), 6)
+        # Starting it first lets the small jobs fill the other worker
+        self.assertEqual(simulate_makespan([4, 1, 1, 1, 1], 2), 4)
+        self.assertEqual(simulate_makespan([], 2), 0)
+
+    def test_insert_into_tree(self):
+        tree = {}
+        insert_into_tree(tree, "file.py", "File description")
+        insert_into_tree(tree, "a/b/nested.py", "Nested description")
+        insert_into_tree(tree, "a/other.py", "Other description")
+
+        self.assertEqual(tree, {
+            "file.py": "File description",
+            "a": {"b": {"nested.py": "Nested description"}, "other.py": "Other description"},
+        })
+
+    def test_run_jobs(self):
+        manifest = [
+            {"path": "small.py", "size": 10},
+            {"path": "pkg/huge.py", "size": 1000},
+        ]
+        analyzed = []
+
+        def analyze(entry):
+            analyzed.append(entry["path"])
+            return f"Description of {entry['path']}"
+
+        progress_bar = MagicMock()
+        contents = run_jobs(manifest, analyze, workers=1, progress_bar=progress_bar)
+
+        self.assertEqual(analyzed, ["pkg/huge.py", "small.py"])
+        self.assertEqual(contents, {
+            "small.py": "Description of small.py",
+            "pkg": {"huge.py": "Description of pkg/huge.py"},
+        })
+        self.assertEqual(progress_bar.next.call_count, 2)
+
+    def test_run_jobs_with_duplicates(self):
+        manifest = [
+            {"path": "service_a/client.py", "size": 1000},
+            {"path": "service_b/client.py", "size": 990},
+            {"path": "main.py", "size": 10},
+        ]
+        duplicates = {"service_b/client.py": ("service_a/client.py", 0.95)}
+        analyzed = []
+
+        def analyze(entry):
+            analyzed.append(entry["path"])
+            return f"Description of {entry['path']}"
+
+        def match_duplicate(entry):
+            return duplicates.get(entry["path"])
+
+        contents = run_jobs(manifest, analyze, workers=2, match_duplicate=match_duplicate)
+        self.assertEqual(sorted(analyzed), ["main.py", "service_a/client.py"])
+        self.assertEqual(contents["service_b"], {"client.py": "Description of service_a/client.py"})
+
+        def analyze_delta(entry, original, description):
+            return f"{description}, updated for {entry['path']}"
+
+        contents = run_jobs(manifest, analyze, workers=2, match_duplicate=match_duplicate, analyze_delta=analyze_delta)
+        self.assertEqual(contents["service_b"],
+                         {"client.py": "Description of service_a/client.py, updated for service_b/client.py"})
+
+    def test_run_jobs_overlaps_duplicate_matching(self):
+        manifest = [
+            {"path": "huge.py", "size": 1000},
+            {"path": "small.py", "size": 10},
+        ]
+        first_analyzed = threading.Event()
+        started_before_matching = []
+
+        def analyze(entry):
+            first_analyzed.set()
+            return f"Description of {entry['path']}"
+
+        def match_duplicate(entry):
+            if entry["path"] == "small.py":
+                # The biggest file is already being analyzed while the next ones are matched
+                started_before_matching.append(first_analyzed.wait(timeout=5))
+            return None
+
+        contents = run_jobs(manifest, analyze, workers=2, match_duplicate=match_duplicate)
+
+        self.assertEqual(started_before_matching, [True])
+        self.assertEqual(len(contents), 2)
+
+    def test_run_jobs_failed_original(self):
+        manifest = [
+            {"path": "service_a/client.py", "size": 1000},
+            {"path": "service_b/client.py", "size": 990},
+            {"path": "service_c/handler.py", "size": 900},
+            {"path": "service_d/handler.py", "size": 890},
+        ]
+        duplicates = {
+            "service_b/client.py": ("service_a/client.py", 0.95),
+            "service_d/handler.py": ("service_c/handler.py", 0.95),
+        }
+
+        def analyze(entry):
+            if entry["path"] == "service_a/client.py":
+                return "Analysis failed after multiple attempts"
+            if entry["path"] == "service_c/handler.py":
+                raise OSError("Permission denied")
+            return f"Description of {entry['path']}"
+
+        contents = run_jobs(manifest, analyze, workers=2, match_duplicate=lambda entry: duplicates.get(entry["path"]))
+
+        # The near-duplicates are analyzed on their own instead of inheriting the error
+        self.assertEqual(contents["service_a"], {"client.py": "Analysis failed after multiple attempts"})
+        self.assertEqual(contents["service_b"], {"client.py": "Description of service_b/client.py"})
+        self.assertEqual(contents["service_c"], {"handler.py": "Error during analysis: Permission denied"})
+        self.assertEqual(contents["service_d"], {"handler.py": "Description of service_d/handler.py"})
+
+    def test_run_jobs_failed_duplicate_matching(self):
+        manifest = [
+            {"path": "gone.py", "size": 1000},
+            {"path": "main.py", "size": 10},
+        ]
+
+        def analyze(entry):
+            if entry["path"] == "gone.py":
+                raise FileNotFoundError("No such file")
+            return f"Description of {entry['path']}"
+
+        def match_duplicate(entry):
+            if entry["path"] == "gone.py":
+                raise FileNotFoundError("No such file")
+            return None
+
+        contents = run_jobs(manifest, analyze, workers=2, match_duplicate=match_duplicate)
+
+        # The file that can't be read is reported like without near-duplicate matching, the others are analyzed
+        self.assertEqual(contents, {
+            "gone.py": "Error during analysis: No such file",
+            "main.py": "Description of main.py",
+        })
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import tempfile
+import unittest
+from unittest.mock import patch
+from src.similarity import shingles, NearDuplicateIndex, find_near_duplicates, summarize_duplicates
+from src.scan_repo import list_directory_contents
+
+HANDLER = "\n".join(
+    f"def handle_{name}(request):\n    user = load_user(request.user_id)\n    return render('{name}.html', user=user)\n"
+    for name in ["home", "profile", "settings", "billing", "orders", "invoices", "reports", "search"]
+)
+HANDLER_COPY = HANDLER.replace("handle_search", "handle_find")
+UNRELATED = "\n".join(f"CONSTANT_{i} = {i * 7}  # value {i}" for i in range(60))
+
+
+class TestSimilarity(unittest.TestCase):
+    def test_shingles(self):
+        self.assertEqual(shingles("a = 1", size=5), {"a = 1"})
+        self.assertEqual(shingles("a  =\n1", size=2), {"a =", "= 1"})
+        self.assertEqual(shingles("   "), set())
+
+    def test_index(self):
+        index = NearDuplicateIndex(0.8)
+        index.add("handler.py", index.signature(HANDLER))
+
+        match = index.query(index.signature(HANDLER_COPY))
+        self.assertEqual(match[0], "handler.py")
+        self.assertGreaterEqual(match[1], 0.8)
+        self.assertEqual(index.query(index.signature(HANDLER)), ("handler.py", 1.0))
+        self.assertIsNone(index.query(index.signature(UNRELATED)))
+        self.assertIsNone(index.signature(""))
+
+    def test_index_invalid_bands(self):
+        with self.assertRaises(ValueError):
+            NearDuplicateIndex(0.8, num_perm=64, bands=10)
+
+    def test_find_near_duplicates(self):
+        contents = {
+            "service_a/handler.py": HANDLER.encode(),
+            "service_b/handler.py": HANDLER_COPY.encode(),
+            "constants.py": UNRELATED.encode(),
+            "empty.py": b"",
+        }
+        manifest = [{"path": path, "size": len(data)} for path, data in contents.items()]
+
+        duplicates = find_near_duplicates(manifest, lambda entry: contents[entry["path"]], 0.8)
+
+        # The biggest file of the pair is analyzed, the other one reuses its summary
+        self.assertEqual(list(duplicates.keys()), ["service_b/handler.py"])
+        self.assertEqual(duplicates["service_b/handler.py"][0], "service_a/handler.py")
+
+        stats = summarize_duplicates(manifest, duplicates, 0.8)
+        self.assertEqual(stats["near_duplicates"], 1)
+        self.assertEqual(stats["files"], 4)
+        self.assertEqual(stats["hit_rate"], 0.25)
+        self.assertEqual(stats["threshold"], 0.8)
+
+    @patch('src.get_code_summary.CodeAnalyzer.analyze_delta')
+    @patch('src.get_code_summary.CodeAnalyzer.analyze_code_block')
+    def test_list_directory_contents(self, mock_analyze_block, mock_analyze_delta):
+        mock_analyze_block.side_effect = lambda code, filename: f"Description of {filename}"
+        mock_analyze_delta.return_value = "Delta description"
+
+        with tempfile.TemporaryDirectory() as repo:
+            for folder, code in [("service_a", HANDLER), ("service_b", HANDLER_COPY)]:
+                os.makedirs(os.path.join(repo, folder))
+                with open(os.path.join(repo, folder, "handler.py"), "w") as f:
+                    f.write(code)
+
+            result = list_directory_contents(repo, similarity_threshold=0.8)
+            self.assertEqual(result, {
+                "service_a": {"handler.py": "Description of handler.py"},
+                "service_b": {"handler.py": "Description of handler.py"},
+            })
+            self.assertEqual(mock_analyze_block.call_count, 1)
+            mock_analyze_delta.assert_not_called()
+
+            result = list_directory_contents(repo, similarity_threshold=0.8, delta_prompts=True)
+            self.assertEqual(result["service_b"], {"handler.py": "Delta description"})
+            mock_analyze_delta.assert_called_once_with(HANDLER_COPY, "service_b/handler.py", HANDLER,
+                                                       "service_a/handler.py", "Description of handler.py")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,187 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import tarfile
+import tempfile
+import unittest
+import zipfile
+from unittest.mock import patch
+from git import Repo
+from src.sources import TarSource, is_archive, is_bare_repo, is_allowed_path, strip_common_root, open_source
+from src.scan_repo import scan_archive
+
+FILES = {
+    "main.py": b"print('hello')",
+    "pkg/module.py": b"x = 1",
+    "node_modules/lib.js": b"var x = 1;",
+    "logo.png": b"png",
+}
+
+
+def sorted_manifest(source):
+    return sorted(source.manifest(), key=lambda entry: entry["path"])
+
+
+class TestSources(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def make_tree(self, path):
+        for name, data in FILES.items():
+            os.makedirs(os.path.dirname(os.path.join(path, name)), exist_ok=True)
+            with open(os.path.join(path, name), "wb") as f:
+                f.write(data)
+
+    def make_tarball(self, extension="tar.gz"):
+        tree = os.path.join(self.root, "project-1.0")
+        self.make_tree(tree)
+        archive_path = os.path.join(self.root, f"project-1.0.{extension}")
+        with tarfile.open(archive_path, "w:gz" if extension == "tar.gz" else "w") as archive:
+            archive.add(tree, arcname="project-1.0")
+        return archive_path
+
+    def make_zip(self):
+        archive_path = os.path.join(self.root, "project.zip")
+        with zipfile.ZipFile(archive_path, "w") as archive:
+            for name, data in FILES.items():
+                archive.writestr(name, data)
+        return archive_path
+
+    def make_bare_repo(self):
+        work_tree = os.path.join(self.root, "work")
+        self.make_tree(work_tree)
+        repo = Repo.init(work_tree)
+        repo.index.add(list(FILES.keys()))
+        repo.index.commit("Initial commit")
+        repo.create_tag("v1.0")
+        with open(os.path.join(work_tree, "main.py"), "wb") as f:
+            f.write(b"print('hello world')")
+        repo.index.add(["main.py"])
+        repo.index.commit("Update main")
+        bare_path = os.path.join(self.root, "mirror.git")
+        repo.clone(bare_path, bare=True)
+        repo.close()
+        return bare_path
+
+    def test_detection(self):
+        tarball, zip_archive, bare_repo = self.make_tarball(), self.make_zip(), self.make_bare_repo()
+
+        self.assertTrue(is_archive(tarball))
+        self.assertTrue(is_archive(zip_archive))
+        self.assertFalse(is_archive(bare_repo))
+        self.assertFalse(is_archive(os.path.join(self.root, "missing.zip")))
+        self.assertTrue(is_bare_repo(bare_repo))
+        self.assertFalse(is_bare_repo(os.path.join(self.root, "work")))
+        self.assertFalse(is_bare_repo(None))
+
+    def test_is_allowed_path(self):
+        self.assertTrue(is_allowed_path("pkg/module.py"))
+        self.assertFalse(is_allowed_path("node_modules/lib.js"))
+        self.assertFalse(is_allowed_path("pkg/.hidden/module.py"))
+        self.assertFalse(is_allowed_path("logo.png"))
+
+    def test_strip_common_root(self):
+        self.assertEqual(strip_common_root(["project/a.py", "project/pkg/b.py"]), "project/")
+        self.assertEqual(strip_common_root(["a.py", "pkg/b.py"]), "")
+        self.assertEqual(strip_common_root(["a/a.py", "b/b.py"]), "")
+
+    def test_tar_source(self):
+        source = open_source(self.make_tarball())
+
+        self.assertEqual(sorted_manifest(source), [{"path": "main.py", "size": 14}, {"path": "pkg/module.py", "size": 5}])
+        self.assertEqual(source.read("pkg/module.py"), b"x = 1")
+        source.close()
+
+    def test_tar_source_plain(self):
+        source = open_source(self.make_tarball("tar"))
+
+        self.assertIsNotNone(source.archive)
+        self.assertEqual(sorted_manifest(source), [{"path": "main.py", "size": 14}, {"path": "pkg/module.py", "size": 5}])
+        self.assertEqual(source.read("pkg/module.py"), b"x = 1")
+        self.assertEqual(source.read("main.py"), b"print('hello')")
+        source.close()
+
+    def test_tar_source_streaming(self):
+        # Files are read out of archive order with an empty buffer, so every backward read starts a new pass
+        source = TarSource(self.make_tarball(), buffer_size=0)
+        self.assertIsNone(source.archive)
+        names = [entry["path"] for entry in source.manifest()]
+
+        for name in reversed(names):
+            self.assertEqual(source.read(name), FILES[name])
+        self.assertEqual(source.buffer, {})
+
+        # With a buffer, the files passed on the way are kept until they're read
+        source = TarSource(self.make_tarball(), buffer_size=1024)
+        self.assertEqual(source.read(names[-1]), FILES[names[-1]])
+        self.assertEqual(list(source.buffer.keys()), [f"project-1.0/{name}" for name in names[:-1]])
+        self.assertEqual(source.read(names[0]), FILES[names[0]])
+        self.assertEqual(len(source.buffer), len(names) - 2)
+        source.close()
+
+    def test_zip_source(self):
+        source = open_source(self.make_zip())
+
+        self.assertEqual(sorted_manifest(source), [{"path": "main.py", "size": 14}, {"path": "pkg/module.py", "size": 5}])
+        self.assertEqual(source.read("main.py"), b"print('hello')")
+        source.close()
+
+    def test_git_tree_source(self):
+        bare_repo = self.make_bare_repo()
+
+        source = open_source(bare_repo)
+        self.assertEqual(sorted_manifest(source), [{"path": "main.py", "size": 20}, {"path": "pkg/module.py", "size": 5}])
+        self.assertEqual(source.read("main.py"), b"print('hello world')")
+        source.close()
+
+        source = open_source(bare_repo, "v1.0")
+        self.assertEqual(source.read("main.py"), b"print('hello')")
+        source.close()
+
+    def test_open_source_invalid(self):
+        with self.assertRaises(ValueError):
+            open_source(self.root)
+
+    @patch('src.get_code_summary.CodeAnalyzer.analyze_code_block')
+    def test_scan_archive(self, mock_analyze_block):
+        mock_analyze_block.side_effect = lambda code, filename: f"{filename}: {code}"
+
+        result = scan_archive(self.make_tarball(), workers=2)
+
+        self.assertEqual(result, {
+            "main.py": "main.py: print('hello')",
+            "pkg": {"module.py": "module.py: x = 1"},
+        })
+
+    @patch('src.get_code_summary.CodeAnalyzer.analyze_delta')
+    @patch('src.get_code_summary.CodeAnalyzer.analyze_code_block')
+    def test_scan_archive_reads_once(self, mock_analyze_block, mock_analyze_delta):
+        mock_analyze_block.side_effect = lambda code, filename: f"Description of {filename}"
+        mock_analyze_delta.return_value = "Delta description"
+
+        # Files of different sizes, so the analysis order isn't the archive order, and some near-duplicates
+        archive_path = os.path.join(self.root, "project.tar.gz")
+        with tarfile.open(archive_path, "w:gz") as archive:
+            for i in range(30):
+                path = os.path.join(self.root, f"module_{i}.py")
+                with open(path, "w") as f:
+                    f.write("".join(f"def function_{j}(value):\n    return value * {j}\n" for j in range(i % 10 + 1)))
+                archive.add(path, arcname=f"project/module_{i}.py")
+
+        with patch('src.sources.tarfile.open', wraps=tarfile.open) as mock_open:
+            result = scan_archive(archive_path, workers=4, similarity_threshold=0.8, delta_prompts=True)
+
+        self.assertEqual(len(result), 30)
+        self.assertGreater(mock_analyze_delta.call_count, 0)
+        # One pass for the member headers, and a single pass for the contents
+        streams = [call for call in mock_open.call_args_list if call.args[1:] == ("r|*",)]
+        self.assertEqual(len(streams), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
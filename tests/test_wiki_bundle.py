@@ -0,0 +1,107 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import tempfile
+import unittest
+from src.utils import hash_content
+from src.wiki_bundle import flatten_context, write_bundle, read_bundle, export_bundle, hash_summary
+
+
+class TestWikiBundle(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.bundle_path = os.path.join(self.temp_dir.name, "wiki.db")
+        self.context = {
+            "file1.py": "File 1 description",
+            "empty.py": "",
+            "subdir": {
+                "subfile.py": "Subfile description"
+            }
+        }
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_flatten_context(self):
+        self.assertEqual(flatten_context(self.context), {
+            "file1.py": "File 1 description",
+            "empty.py": "",
+            "subdir/subfile.py": "Subfile description",
+        })
+
+    def test_write_and_read_bundle(self):
+        write_bundle(self.context, self.bundle_path, model="test-model",
+                     content_hashes={"subdir/subfile.py": hash_content(b"x = 1")})
+        pages = read_bundle(self.bundle_path)
+
+        self.assertEqual(sorted(pages.keys()), ["empty.py", "file1.py", "subdir/subfile.py"])
+        self.assertEqual(pages["subdir/subfile.py"]["summary"], "Subfile description")
+        self.assertEqual(pages["subdir/subfile.py"]["summary_hash"], hash_summary("Subfile description"))
+        self.assertEqual(pages["subdir/subfile.py"]["content_hash"], hash_content(b"x = 1"))
+        self.assertEqual(pages["file1.py"]["content_hash"], "")
+        self.assertEqual(pages["subdir/subfile.py"]["model"], "test-model")
+        self.assertEqual(list(read_bundle(self.bundle_path, "subdir/").keys()), ["subdir/subfile.py"])
+
+        # Without a prefix, pages are only added or updated
+        write_bundle({"file1.py": "New description"}, self.bundle_path, model="test-model")
+        pages = read_bundle(self.bundle_path)
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(pages["file1.py"]["summary"], "New description")
+
+    def test_write_bundle_with_prefix(self):
+        write_bundle({"main.py": "Service A"}, self.bundle_path, prefix="service-a/",
+                     content_hashes={"main.py": hash_content(b"print('a')")})
+        self.assertEqual(read_bundle(self.bundle_path)["service-a/main.py"]["content_hash"], hash_content(b"print('a')"))
+        write_bundle({"main.py": "Service B"}, self.bundle_path, prefix="service-b/")
+        write_bundle({"other.py": "Service A other"}, self.bundle_path, prefix="service-a/")
+
+        # Only the pages of the rewritten repository are removed
+        pages = read_bundle(self.bundle_path)
+        self.assertEqual(list(pages.keys()), ["service-a/other.py", "service-b/main.py"])
+
+        write_bundle({"main.py": "Unprefixed"}, self.bundle_path)
+        self.assertEqual(len(read_bundle(self.bundle_path)), 3)
+
+    def test_read_bundle_invalid(self):
+        with self.assertRaises(ValueError):
+            read_bundle(os.path.join(self.temp_dir.name, "missing.db"))
+
+    def test_export_bundle(self):
+        output_path = os.path.join(self.temp_dir.name, "wiki")
+        write_bundle(self.context, self.bundle_path, prefix="repo/")
+
+        self.assertEqual(export_bundle(self.bundle_path, output_path), (2, 0))
+        with open(os.path.join(output_path, "repo", "subdir", "subfile.md")) as f:
+            self.assertEqual(f.read(), "Subfile description")
+        self.assertFalse(os.path.exists(os.path.join(output_path, "repo", "empty.md")))
+
+        # Only the changed pages are written again, and the pages of deleted files are removed
+        write_bundle({"file1.py": "New description"}, self.bundle_path, prefix="repo/")
+        self.assertEqual(export_bundle(self.bundle_path, output_path), (1, 1))
+        with open(os.path.join(output_path, "repo", "file1.md")) as f:
+            self.assertEqual(f.read(), "New description")
+        self.assertFalse(os.path.exists(os.path.join(output_path, "repo", "subdir")))
+
+        self.assertEqual(export_bundle(self.bundle_path, output_path), (0, 0))
+
+    def test_export_bundle_keeps_other_files(self):
+        # A Wiki checkout has its own pages and a .git folder, which aren't part of the bundle
+        output_path = os.path.join(self.temp_dir.name, "wiki")
+        os.makedirs(os.path.join(output_path, ".git", "refs", "tags"))
+        for name in ["Home.md", "_Sidebar.md"]:
+            with open(os.path.join(output_path, name), "w") as f:
+                f.write("Maintained by hand")
+
+        write_bundle(self.context, self.bundle_path, prefix="repo/")
+        self.assertEqual(export_bundle(self.bundle_path, output_path), (2, 0))
+        write_bundle({}, self.bundle_path, prefix="repo/")
+        self.assertEqual(export_bundle(self.bundle_path, output_path), (0, 2))
+
+        self.assertTrue(os.path.isfile(os.path.join(output_path, "Home.md")))
+        self.assertTrue(os.path.isfile(os.path.join(output_path, "_Sidebar.md")))
+        self.assertTrue(os.path.isdir(os.path.join(output_path, ".git", "refs", "tags")))
+        self.assertFalse(os.path.exists(os.path.join(output_path, "repo")))
+
+if __name__ == "__main__":
+    unittest.main()